@@ -0,0 +1,177 @@
+"""
+Headless batch runner: generate outreach emails for many careers pages without the UI.
+
+Each input line is a JSON object with a "url" and optional per-URL settings
+("tone", "variant_count", "user_name", "company_name", "summary", "benefits",
+"incremental", "render") that override the command-line defaults. One JSON result per URL is written
+to the output as soon as that URL finishes.
+
+    python app/batch.py urls.jsonl -o results.jsonl --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+if __package__:
+    # Run as `python -m app.batch`: the app modules import each other as top-level modules
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chains import Chain  # noqa: E402
+from fetcher import fetch_text_safely  # noqa: E402
+from portfolio import Portfolio  # noqa: E402
+from snapshots import SnapshotStore  # noqa: E402
+from tracing import tracer  # noqa: E402
+from utils import clean_text  # noqa: E402
+
+SETTING_KEYS = ("tone", "variant_count", "user_name", "company_name", "summary", "benefits", "incremental", "render")
+
+
+def read_requests(path):
+    """
+    Yield (line_number, request, error) for each non-empty line of a JSONL file ('-' for stdin).
+    A line that is not a JSON object yields request None and the parse error, so one bad line
+    doesn't stop the rest of the batch.
+    """
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Line {line_number} is not valid JSON: {str(e)}"
+                continue
+            if not isinstance(request, dict):
+                yield line_number, None, f"Line {line_number} is not a JSON object"
+                continue
+            yield line_number, request, None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def process_url(chain, portfolio, request, defaults, snapshots=None):
+    """Run fetch -> clean -> extract -> retrieve -> write for one URL and return a result record."""
+    started = time.perf_counter()
+    settings = {key: request.get(key, defaults[key]) for key in SETTING_KEYS}
+    result = {"url": request.get("url"), "jobs": [], "error": None}
+
+    try:
+        if not result["url"]:
+            raise ValueError("Request has no 'url'")
+        content, fetch_error = fetch_text_safely(result["url"], render=settings["render"])
+        if fetch_error:
+            raise RuntimeError(fetch_error)
+
+        if settings["incremental"] and snapshots is not None:
+            jobs, report = chain.extract_jobs_incremental(result["url"], clean_text(content), snapshots)
+            result["incremental"] = {key: value for key, value in report.items() if key != "removed"}
+            result["removed_jobs"] = report["removed"]
+        else:
+            jobs = chain.extract_jobs(clean_text(content))
+        links = portfolio.query_links_batch([job.get("skills", []) for job in jobs])
+        result["jobs"] = [{"job": job.to_dict(), "emails": [None] * settings["variant_count"], "errors": []} for job in jobs]
+
+        for job_idx, variant_id, email, error in chain.write_mails(
+            jobs, links, settings["variant_count"],
+            tone=settings["tone"],
+            user_name=settings["user_name"],
+            company_name=settings["company_name"],
+            summary=settings["summary"],
+            benefits=settings["benefits"]
+        ):
+            if error:
+                result["jobs"][job_idx]["errors"].append(f"Variant {variant_id}: {str(error)}")
+            else:
+                result["jobs"][job_idx]["emails"][variant_id - 1] = email
+    except Exception as e:
+        result["error"] = str(e)
+        if defaults.get("debug"):
+            result["traceback"] = traceback.format_exc()
+
+    result["elapsed"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of URL requests, or '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for results (default: stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="URLs processed concurrently")
+    parser.add_argument("--portfolio", default="app/resources/my_portfolio.csv")
+    parser.add_argument("--tone", default="Professional")
+    parser.add_argument("--variant-count", type=int, default=1)
+    parser.add_argument("--user-name", default="Mohan")
+    parser.add_argument("--company-name", default="AtliQ")
+    parser.add_argument("--summary", default="")
+    parser.add_argument("--benefits", default="")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-extract page sections that changed since the URL was last scraped")
+    parser.add_argument("--render", choices=["auto", "always", "never"], default=None,
+                        help="Render pages in a headless browser (default: SMARTREACH_RENDER, else auto)")
+    parser.add_argument("--snapshots", default="snapshots.sqlite", help="Page snapshot store for incremental runs")
+    parser.add_argument("--debug", action="store_true", help="Include tracebacks in failed results")
+    parser.add_argument("--trace-file", help="Append per-stage spans to this JSONL file")
+    parser.add_argument("--metrics-file", help="Write per-stage latency in Prometheus text format when done")
+    args = parser.parse_args(argv)
+
+    defaults = {
+        "tone": args.tone,
+        "variant_count": args.variant_count,
+        "user_name": args.user_name,
+        "company_name": args.company_name,
+        "summary": args.summary,
+        "benefits": args.benefits,
+        "incremental": args.incremental,
+        "render": args.render,
+        "debug": args.debug
+    }
+
+    if args.trace_file:
+        tracer.jsonl_path = args.trace_file
+
+    chain = Chain()
+    portfolio = Portfolio(args.portfolio)
+    portfolio.load_portfolio()
+    snapshots = SnapshotStore(args.snapshots)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "a")
+    completed = failed = 0
+    started = time.perf_counter()
+
+    def write_result(result):
+        nonlocal completed, failed
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        completed += 1
+        failed += result["error"] is not None
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = []
+            for line_number, request, error in read_requests(args.input):
+                if error:
+                    write_result({"url": None, "line": line_number, "jobs": [], "error": error, "elapsed": 0.0})
+                else:
+                    futures.append(executor.submit(process_url, chain, portfolio, request, defaults, snapshots))
+            for future in as_completed(futures):
+                write_result(future.result())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Processed {completed} URLs ({failed} failed) in {elapsed:.1f}s", file=sys.stderr)
+    if args.metrics_file:
+        tracer.export_prometheus(args.metrics_file)
+    return 1 if failed and failed == completed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
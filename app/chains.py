@@ -2,189 +2,476 @@ import os
 import certifi
 os.environ["SSL_CERT_FILE"] = certifi.where()
 
-from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
+from langchain_core.utils.json import parse_json_markdown
 from dotenv import load_dotenv
+from cache import LLMCache
+from dedup import deduplicate_jobs, duplicate_groups
+from json_recovery import recover_json_objects
+from llm_backends import create_llm, rate_limits
+from models import Job
+from ratelimit import RateLimitScheduler, INTERACTIVE, BACKGROUND
+from tracing import span, tracer
 import re
 import json
-from typing import List, Dict, Any
+import time
+import hashlib
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple
 
 load_dotenv()
 
+PROMPT_DIR = os.getenv("SMARTREACH_PROMPT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts"))
+CHARS_PER_TOKEN = 3.5  # Conservative characters-per-token ratio for cleaned English text
+JOB_KEYWORD_RE = re.compile(r"(job|position|role|opening|career|opportunity)", re.IGNORECASE)
+
+def load_prompt(name: str, version: str = None, prompt_dir: str = PROMPT_DIR) -> PromptTemplate:
+    """
+    Load the prompt template stored as <prompt_dir>/<name>.<version>.txt.
+    Without a version, SMARTREACH_PROMPT_<NAME>_VERSION is used, falling back to the latest version on disk.
+    """
+    version = version or os.getenv(f"SMARTREACH_PROMPT_{name.upper()}_VERSION")
+    if not version:
+        versions = [
+            filename[len(name) + 1:-len(".txt")]
+            for filename in os.listdir(prompt_dir)
+            if filename.startswith(name + ".v") and filename.endswith(".txt")
+        ]
+        if not versions:
+            raise FileNotFoundError(f"No prompt named '{name}' in {prompt_dir}")
+        version = max(versions, key=lambda v: int(v[1:]) if v[1:].isdigit() else -1)
+
+    with open(os.path.join(prompt_dir, f"{name}.{version}.txt")) as f:
+        return PromptTemplate.from_template(f.read())
+
+class IncompleteExtraction(Exception):
+    """An extraction response that could only be partly recovered; jobs holds what was salvaged."""
+
+    def __init__(self, jobs: List[Job], stats: Dict[str, Any]):
+        super().__init__(f"Incomplete extraction: recovered {stats['recovered']} jobs, lost {stats['lost']}")
+        self.jobs = jobs
+        self.stats = stats
+
 class Chain:
-    def __init__(self):
-        self.llm = ChatGroq(temperature=0.7, groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama-3.1-8b-instant")
-        self.max_chunk_size = 8000  # Characters per chunk
+    def __init__(self, max_workers=4, chunk_timeout=60, max_retries=3, retry_backoff=2.0,
+                 use_cache=True, cache_variants=True, llm=None, backend=None, prompt_dir=PROMPT_DIR,
+                 prompt_versions=None, scheduler=None, batch_variants=True):
+        # An explicit llm wins; otherwise the backend (or LLM_BACKEND) picks one from the registry
+        self.llm = llm or create_llm(backend, timeout=chunk_timeout)
+        # Every LLM call goes through one scheduler so concurrent calls stay within the provider's limits
+        self.scheduler = scheduler or RateLimitScheduler(*(rate_limits(backend) if llm is None else (0, 0)))
+        self.output_token_estimate = 500  # Completion tokens reserved per call until real usage is known
+        # Prompts and pipelines are built once and reused for every call
+        prompt_versions = prompt_versions or {}
+        self.prompt_extract = load_prompt("extract_jobs", prompt_versions.get("extract_jobs"), prompt_dir)
+        self.prompt_email = load_prompt("write_mail", prompt_versions.get("write_mail"), prompt_dir)
+        self.prompt_variants = load_prompt("write_mail_variants", prompt_versions.get("write_mail_variants"),
+                                           prompt_dir)
+        self.chain_extract = self.prompt_extract | self.llm
+        self.chain_email = self.prompt_email | self.llm
+        self.chain_variants = self.prompt_variants | self.llm
+        self.cache = LLMCache() if use_cache else None  # Responses keyed on model, template and inputs
+        self.cache_variants = cache_variants  # Cache emails per variant_id; False always regenerates
+        self.batch_variants = batch_variants  # Ask for all of a job's variants in one call
+        self.context_window = 8192  # Tokens the model accepts per request (prompt + completion)
+        self.max_output_tokens = 2048  # Tokens reserved for the extraction response
+        self.max_chunk_tokens = 2000  # Preferred page tokens per chunk
+        self.chunk_overlap_tokens = 100  # Tokens repeated between neighbouring chunks
+        self.max_workers = max_workers  # Concurrent LLM calls per page
+        self.chunk_timeout = chunk_timeout  # Seconds before a single chunk call is abandoned
+        self.max_retries = max_retries  # Retries per chunk on rate-limit/timeout errors
+        self.retry_backoff = retry_backoff  # Base delay in seconds, doubled on each retry
 
-    def extract_jobs(self, cleaned_text):
+    def extract_jobs(self, cleaned_text, concurrent=True, with_stats=False):
         """
         Extract job postings from scraped text, with chunking for large texts.
-        Returns a list of job dictionaries.
+        Chunks are sent to the LLM in parallel (up to max_workers at a time)
+        unless concurrent is False. Returns a list of Job records, or (jobs, chunk stats)
+        with with_stats.
         """
-        # If text is small enough, process directly
-        if len(cleaned_text) < self.max_chunk_size:
-            return self._process_job_chunk(cleaned_text)
-        
-        # For larger text, chunk it and process each chunk
-        chunks = self._chunk_text(cleaned_text)
+        chunks, stats = self._chunk_text(cleaned_text)
+        jobs = self._extract_chunks(chunks, concurrent)
+        return (jobs, stats) if with_stats else jobs
+
+    def _extract_chunks(self, chunks: List[str], concurrent=True) -> List[Job]:
+        """Extract jobs from each chunk and merge the duplicates found across chunks."""
+        # If text fits in a single chunk, process it in this thread; the LLM can still repeat a posting
+        if len(chunks) == 1:
+            return self._deduplicate_jobs(self._process_chunk_with_retry(chunks[0]))
         
-        # Process each chunk and collect results
+        # Process each chunk, keeping results in chunk order
+        if concurrent and self.max_workers > 1 and len(chunks) > 1:
+            chunk_results = self._process_chunks_concurrently(chunks)
+        else:
+            chunk_results = [self._process_chunk_safely(i, chunk) for i, chunk in enumerate(chunks)]
+
         all_jobs = []
-        for i, chunk in enumerate(chunks):
-            try:
-                chunk_jobs = self._process_job_chunk(chunk)
-                if chunk_jobs:
-                    all_jobs.extend(chunk_jobs if isinstance(chunk_jobs, list) else [chunk_jobs])
-            except Exception as e:
-                print(f"Error processing chunk {i+1}: {str(e)}")
+        for chunk_jobs in chunk_results:
+            if chunk_jobs:
+                all_jobs.extend(chunk_jobs if isinstance(chunk_jobs, list) else [chunk_jobs])
         
         # De-duplicate jobs based on role names
         return self._deduplicate_jobs(all_jobs)
+
+    def _process_chunks_concurrently(self, chunks: List[str], strict=False) -> List[List[Job]]:
+        """
+        Process chunks on a bounded thread pool and return their results in chunk order (None for failures).
+        With strict, a chunk whose response was only partly recovered yields its IncompleteExtraction.
+        """
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks)))
+        # Retries sleep between attempts, so allow for them on top of the per-call timeout
+        deadline = self.chunk_timeout * (self.max_retries + 1) + self.retry_backoff * 2 ** self.max_retries
+        try:
+            futures = [executor.submit(self._process_chunk_with_retry, chunk, strict) for chunk in chunks]
+            results = []
+            for i, future in enumerate(futures):
+                try:
+                    results.append(future.result(timeout=deadline))
+                except IncompleteExtraction as e:
+                    print(f"Error processing chunk {i+1}: {str(e)}")
+                    results.append(e)
+                except Exception as e:
+                    print(f"Error processing chunk {i+1}: {str(e)}")
+                    results.append(None)
+        finally:
+            # Don't block on chunks that timed out, and drop the ones that never started
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _process_chunk_safely(self, index: int, chunk: str, strict=False) -> List[Job]:
+        """
+        Process a chunk with retries, logging a final failure and returning None for it
+        (or the IncompleteExtraction, with strict).
+        """
+        try:
+            return self._process_chunk_with_retry(chunk, strict)
+        except IncompleteExtraction as e:
+            print(f"Error processing chunk {index+1}: {str(e)}")
+            return e
+        except Exception as e:
+            print(f"Error processing chunk {index+1}: {str(e)}")
+            return None
+
+    def _process_chunk_with_retry(self, chunk: str, strict=False) -> List[Job]:
+        """Process a chunk, retrying with exponential backoff on timeouts (the scheduler retries the rest)."""
+        with span("extract_chunk", chars=len(chunk), retries=0) as attrs:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    jobs = self._process_job_chunk(chunk, strict)
+                    attrs["jobs"] = len(jobs)
+                    return jobs
+                except Exception as e:
+                    if attempt == self.max_retries or isinstance(e, IncompleteExtraction) or \
+                            not self._is_retryable_error(e):
+                        raise
+                    attrs["retries"] = attempt + 1
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def _invoke_chain(self, chain, inputs: Dict[str, Any], use_cache=True, stage="llm", priority=BACKGROUND,
+                      validate=None) -> str:
+        """
+        Run a prompt | llm pipeline through the rate-limit scheduler and return the response text,
+        serving repeats from the cache. With validate, a response is only cached if validate(text)
+        is true, so a malformed reply is not replayed for the cache's whole TTL.
+        """
+        with span(stage, cached=False) as attrs:
+            key = None
+            if self.cache is not None and use_cache:
+                key = self._cache_key(chain, inputs)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    attrs["cached"] = True
+                    return cached
+
+            res = self.scheduler.call(
+                lambda: chain.invoke(inputs), self._estimate_call_tokens(chain, inputs), priority,
+                usage=lambda res: (getattr(res, "usage_metadata", None) or {}).get("total_tokens")
+            )
+            usage = getattr(res, "usage_metadata", None) or {}
+            attrs["prompt_tokens"] = usage.get("input_tokens")
+            attrs["completion_tokens"] = usage.get("output_tokens")
+            if key is not None and (validate is None or validate(res.content)):
+                self.cache.set(key, res.content)
+            return res.content
+
+    def _estimate_call_tokens(self, chain, inputs: Dict[str, Any]) -> int:
+        """Prompt plus expected completion tokens of one call, for the scheduler's token budget."""
+        prompt = chain.first.template + "".join(str(value) for value in inputs.values())
+        return self._estimate_tokens(prompt) + self.output_token_estimate
+
+    @staticmethod
+    def _parse_json_strict(content: str):
+        """Parse a JSON response (optionally in a ```json fence) without completing truncated output."""
+        try:
+            return parse_json_markdown(content, parser=json.loads)
+        except ValueError as e:
+            raise OutputParserException(f"Invalid json output: {str(e)}")
+
+    @classmethod
+    def _is_valid_json(cls, content: str) -> bool:
+        try:
+            cls._parse_json_strict(content)
+            return True
+        except OutputParserException:
+            return False
+
+    def _model_name(self) -> str:
+        return getattr(self.llm, "model_name", type(self.llm).__name__)
+
+    def _cache_key(self, chain, inputs: Dict[str, Any]) -> str:
+        return LLMCache.make_key(self._model_name(), chain.first.template, inputs)
+
+    def _chunk_hash(self, chunk: str) -> str:
+        """Key of a chunk's stored jobs; a new model or extraction prompt re-extracts every chunk."""
+        key = f"{self._model_name()}\x1f{self.prompt_extract.template}\x1f{chunk}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _is_retryable_error(error: Exception) -> bool:
+        """Return True for timeout errors; rate limits and other transient errors are retried by the scheduler."""
+        if "timeout" in type(error).__name__.lower():
+            return True
+        return any(marker in str(error).lower() for marker in ("timed out", "timeout"))
     
-    def _chunk_text(self, text: str) -> List[str]:
-        """Split text into smaller chunks with potential job overlap."""
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Conservative token estimate for cleaned page text (about 3.5 characters per token)."""
+        return int(len(text) / CHARS_PER_TOKEN) + 1
+
+    def _chunk_token_budget(self) -> int:
+        """Page tokens that fit in one extraction request alongside the prompt and the response."""
+        prompt_tokens = self._estimate_tokens(self.prompt_extract.template)
+        available = self.context_window - self.max_output_tokens - prompt_tokens
+        return max(1, min(self.max_chunk_tokens, available))
+
+    def _chunk_text(self, text: str) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Split text into chunks that each fit the model's context window.
+        Neighbouring chunks overlap by at most chunk_overlap_tokens so a posting cut at a
+        boundary is still seen whole; chunks prefer to end just before a job keyword.
+        Returns (chunks, stats), where stats is the token accounting of the split.
+        """
+        started = time.perf_counter()
+        chunk_chars = int(self._chunk_token_budget() * CHARS_PER_TOKEN)
+        overlap_chars = min(int(self.chunk_overlap_tokens * CHARS_PER_TOKEN), chunk_chars // 4)
+
         chunks = []
-        # Use regex to find potential job section indicators
-        job_patterns = r"(job|position|role|opening|career|opportunity)"
-        
-        # Find all potential job section starts
-        job_indices = [m.start() for m in re.finditer(job_patterns, text, re.IGNORECASE)]
-        job_indices = [0] + job_indices + [len(text)]
-        job_indices = sorted(list(set(job_indices)))  # Remove duplicates and sort
-        
-        # Create chunks with overlap between potential job sections
-        for i in range(len(job_indices) - 1):
-            chunk_start = max(0, job_indices[i] - 200)  # Include some context before
-            
-            # Calculate end to not exceed max chunk size
-            chunk_end = min(job_indices[i] + self.max_chunk_size, len(text))
-            if i+1 < len(job_indices):
-                chunk_end = min(chunk_end, job_indices[i+1] + 500)  # Include overlap
-            
-            chunks.append(text[chunk_start:chunk_end])
-            
-            # Skip ahead if we've already covered text in our chunk
-            if i+1 < len(job_indices) and job_indices[i+1] < chunk_end - 200:
-                continue
-        
-        # Ensure we don't have too many chunks
-        if len(chunks) > 5:
-            # Combine chunks to avoid having too many
-            new_chunks = []
-            for i in range(0, len(chunks), 2):
-                if i+1 < len(chunks):
-                    new_chunks.append(chunks[i] + " " + chunks[i+1])
-                else:
-                    new_chunks.append(chunks[i])
-            chunks = new_chunks
-            
-        # If we still don't have any chunks (rare case), create evenly sized chunks
-        if not chunks:
-            chunk_size = self.max_chunk_size - 500  # Leave room for overlap
-            for i in range(0, len(text), chunk_size):
-                chunks.append(text[i:i + chunk_size])
-        
-        return chunks
-
-    def _process_job_chunk(self, chunk_text: str) -> List[Dict[str, Any]]:
-        """Process a single text chunk to extract job information."""
-        prompt_extract = PromptTemplate.from_template(
-            """
-            ### SCRAPED TEXT FROM WEBSITE:
-            {page_data}
-            ### INSTRUCTION:
-            The scraped text is from the career's page of a website.
-            Your job is to extract the job postings and return them in JSON format containing the following keys: `role`, `experience`, `skills` and `description`.
-            If multiple jobs are found, return an array of job objects.
-            If no jobs are found, return an empty array.
-            Only return the valid JSON with no additional text.
-            ### VALID JSON ARRAY (NO PREAMBLE):
-            """
-        )
-        chain_extract = prompt_extract | self.llm
-        res = chain_extract.invoke(input={"page_data": chunk_text})
+        start = 0
+        while start < len(text):
+            end = min(start + chunk_chars, len(text))
+            if end < len(text):
+                end = self._chunk_boundary(text, start + chunk_chars * 3 // 4, end)
+            chunks.append(text[start:end].strip())
+            if end >= len(text):
+                break
+            # Step back by the overlap, then forward to a word boundary
+            next_start = max(end - overlap_chars, start + 1)
+            space = text.find(" ", next_start, end)
+            start = space + 1 if space != -1 else next_start
+
+        chunks = [chunk for chunk in chunks if chunk] or [text]
+
+        page_tokens = self._estimate_tokens(text)
+        sent_tokens = sum(self._estimate_tokens(chunk) for chunk in chunks)
+        stats = {
+            "chunks": len(chunks),
+            "page_tokens": page_tokens,
+            "sent_tokens": sent_tokens,
+            "overlap_ratio": sent_tokens / page_tokens - 1
+        }
+        tracer.add("chunk", (time.perf_counter() - started) * 1000, **stats)
+        return chunks, stats
+
+    def _content_defined_chunks(self, text: str) -> List[str]:
+        """
+        Split text at content-defined word boundaries, so an edit only changes the chunks around it.
+        A chunk ends after a word pair whose hash hits a fixed residue, once it holds a quarter of the
+        token budget, and never grows past the budget. Each chunk starts with the tail of the previous one.
+        """
+        max_chars = int(self._chunk_token_budget() * CHARS_PER_TOKEN)
+        overlap_chars = min(int(self.chunk_overlap_tokens * CHARS_PER_TOKEN), max_chars // 4)
+        body_chars = max_chars - overlap_chars
+        min_chars = body_chars // 4
+        divisor = max(1, min_chars // 6)  # About min_chars more text (at ~6 chars a word) before a boundary
+
+        bodies = []
+        current = []
+        length = 0
+        previous_word = ""
+        for word in text.split():
+            if current and length + len(word) + 1 > body_chars:
+                bodies.append(" ".join(current))
+                current, length = [], 0
+            current.append(word)
+            length += len(word) + 1
+            if length >= min_chars and zlib.crc32(f"{previous_word} {word}".encode("utf-8")) % divisor == 0:
+                bodies.append(" ".join(current))
+                current, length = [], 0
+            previous_word = word
+        if current:
+            bodies.append(" ".join(current))
+
+        chunks = []
+        for i, body in enumerate(bodies):
+            if i and overlap_chars:
+                tail = bodies[i - 1][-overlap_chars:]
+                body = tail[tail.find(" ") + 1:] + " " + body
+            chunks.append(body)
+        return chunks or [text]
+
+    def extract_jobs_incremental(self, url: str, cleaned_text: str, store) -> Tuple[List[Job], Dict[str, Any]]:
+        """
+        Extract jobs from a page, re-sending only the chunks that changed since its last snapshot in store.
+        Returns (jobs, report); the report counts reused and re-extracted chunks, estimates the tokens
+        sent, and lists postings from the previous scrape that are gone under "removed".
+        """
+        with span("extract_incremental", url=url) as attrs:
+            chunks = self._content_defined_chunks(cleaned_text)
+            hashes = [self._chunk_hash(chunk) for chunk in chunks]
+            known = {h: [Job.from_dict(job) for job in jobs] for h, jobs in store.chunk_jobs(hashes).items()}
+            pending = {h: chunk for h, chunk in zip(hashes, chunks) if h not in known}
+
+            if len(pending) > 1 and self.max_workers > 1:
+                results = self._process_chunks_concurrently(list(pending.values()), strict=True)
+            else:
+                results = [self._process_chunk_safely(i, chunk, strict=True)
+                           for i, chunk in enumerate(pending.values())]
+            # Failed and partly recovered chunks are not stored, so the next scrape retries them;
+            # the jobs salvaged from a partial response are still used for this scrape
+            extracted = {h: jobs for h, jobs in zip(pending, results) if isinstance(jobs, list)}
+            store.save_chunk_jobs({h: [job.to_dict() for job in jobs] for h, jobs in extracted.items()})
+            known.update(extracted)
+            known.update((h, result.jobs) for h, result in zip(pending, results)
+                         if isinstance(result, IncompleteExtraction))
+
+            jobs = self._deduplicate_jobs([job for h in hashes for job in known.get(h, [])])
+            _, previous_jobs = store.load_snapshot(url)
+            removed = self._removed_jobs([Job.from_dict(job) for job in previous_jobs], jobs)
+            store.save_snapshot(url, hashes, [job.to_dict() for job in jobs])
+
+            report = {
+                "chunks": len(chunks),
+                "reused": len(chunks) - len(pending),
+                "extracted": len(extracted),
+                "failed": len(pending) - len(extracted),
+                "page_tokens": self._estimate_tokens(cleaned_text),
+                "sent_tokens": sum(self._estimate_tokens(chunk) for chunk in pending.values()),
+                "removed": removed
+            }
+            attrs.update({key: value for key, value in report.items() if key != "removed"}, removed=len(removed))
+        return jobs, report
+
+    @staticmethod
+    def _removed_jobs(previous_jobs: List[Job], jobs: List[Job]) -> List[Dict[str, Any]]:
+        """Jobs from the previous scrape with no near-duplicate among the current jobs, as dicts flagged as removed."""
+        combined = jobs + previous_jobs
+        removed = []
+        for group in duplicate_groups(combined):
+            if all(i >= len(jobs) for i in group):
+                removed.append(dict(combined[group[0]].to_dict(), status="removed"))
+        return removed
+
+    @staticmethod
+    def _chunk_boundary(text: str, lower: int, upper: int) -> int:
+        """Pick where a chunk ends: before the last job keyword in [lower, upper), else the last space."""
+        last_keyword = None
+        for match in JOB_KEYWORD_RE.finditer(text, lower, upper):
+            last_keyword = match.start()
+        if last_keyword is not None and last_keyword > lower:
+            return last_keyword
+        space = text.rfind(" ", lower, upper)
+        return space if space > lower else upper
+
+    def _process_job_chunk(self, chunk_text: str, strict=False) -> List[Job]:
+        """
+        Process a single text chunk to extract job information.
+        With strict, a response that loses jobs or yields none raises IncompleteExtraction
+        instead of returning the jobs that could be recovered.
+        """
+        content = self._invoke_chain(self.chain_extract, {"page_data": chunk_text}, stage="llm.extract",
+                                     validate=self._is_valid_json)
         
         try:
-            json_parser = JsonOutputParser()
-            parsed_result = json_parser.parse(res.content)
-            
-            # Ensure we always return a list
-            if isinstance(parsed_result, dict):
-                return [parsed_result]
-            elif isinstance(parsed_result, list):
-                return parsed_result
-            else:
-                return []
+            return self._to_jobs(self._parse_json_strict(content))
         except OutputParserException as e:
-            # Try to extract JSON from the response using regex
+            # Keep every complete job from a truncated or wrapped response instead of dropping the chunk
+            objects, stats = recover_json_objects(content)
+            tracer.add("json_recovery", 0, **stats)
+            if stats["lost"] or not objects:
+                if strict:
+                    raise IncompleteExtraction(self._to_jobs(objects), stats)
+                print(f"Error parsing output: {str(e)}; recovered {stats['recovered']} jobs, lost {stats['lost']}")
+            return self._to_jobs(objects)
+
+    @staticmethod
+    def _to_jobs(parsed) -> List[Job]:
+        """Validated, non-empty Jobs from a parsed extraction response (an object or an array of them)."""
+        jobs = []
+        for item in parsed if isinstance(parsed, list) else [parsed]:
             try:
-                json_matches = re.findall(r'(\[.*\]|\{.*\})', res.content, re.DOTALL)
-                if json_matches:
-                    for match in json_matches:
-                        try:
-                            parsed = json.loads(match)
-                            if isinstance(parsed, dict):
-                                return [parsed]
-                            elif isinstance(parsed, list):
-                                return parsed
-                        except:
-                            continue
-            except:
-                pass
-                
-            # If all attempts fail, return empty list
-            print(f"Error parsing output: {str(e)}")
-            return []
-
-    def _deduplicate_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate jobs based on role name and description similarity."""
-        if not jobs:
-            return []
-        
-        # Create a dictionary with role as key to identify duplicates
-        unique_jobs = {}
-        
-        for job in jobs:
-            role = job.get('role', '').strip().lower()
-            desc = job.get('description', '').strip().lower()
-            
-            # Skip empty roles
-            if not role:
+                job = Job.from_dict(item)
+            except ValueError as e:
+                print(f"Skipping malformed job: {str(e)}")
                 continue
-                
-            # Create a simple hash for the job using first 100 chars of description
-            job_hash = f"{role}_{desc[:100] if desc else ''}"
-            
-            # If this is a new job or has a more complete entry than existing
-            if job_hash not in unique_jobs or \
-               len(job.get('description', '')) > len(unique_jobs[job_hash].get('description', '')) or \
-               len(job.get('skills', [])) > len(unique_jobs[job_hash].get('skills', [])):
-                unique_jobs[job_hash] = job
-        
-        return list(unique_jobs.values())
+            if not job.is_empty():
+                jobs.append(job)
+        return jobs
+
+    def _deduplicate_jobs(self, jobs: List[Job]) -> List[Job]:
+        """Merge near-duplicate jobs (MinHash/LSH over role, skills and description)."""
+        with span("dedupe", raw_jobs=len(jobs)) as attrs:
+            unique_jobs = deduplicate_jobs(jobs)
+            attrs["jobs"] = len(unique_jobs)
+            return unique_jobs
 
     def write_mail(self, job, links, tone="Professional", variant_id=1, user_name="Mohan", company_name="AtliQ", summary="", benefits=""):
-        prompt_email = PromptTemplate.from_template(
-            """
-            ### JOB DESCRIPTION:
-            {job_description}
-
-            ### INSTRUCTION:
-            You are {user_name}, a business development executive at {company_name}. {summary}
-            Your job is to write a cold email to the client regarding the job mentioned above describing how your company can fulfill their needs.
-            Mention these key advantages: {benefits}
-            Use a {tone} tone.
-            This is version #{variant_id}, try phrasing it slightly differently.
-            Also add the most relevant ones from the following links to showcase your portfolio: {link_list}
-            Do not provide a preamble.
-            ### EMAIL (NO PREAMBLE):
-            """
-        )
-        chain_email = prompt_email | self.llm
-        res = chain_email.invoke({
-            "job_description": str(job),
+        return self._invoke_chain(self.chain_email, self._mail_inputs(
+            job, links, tone, variant_id, user_name, company_name, summary, benefits
+        ), use_cache=self.cache_variants, stage="llm.email", priority=INTERACTIVE,
+            validate=lambda content: bool(content.strip()))
+
+    def stream_mail(self, job, links, tone="Professional", variant_id=1, user_name="Mohan", company_name="AtliQ",
+                    summary="", benefits="", stats=None):
+        """
+        Like write_mail, but yields the email text piece by piece as the model generates it.
+        If a stats dict is given, time_to_first_token and total latency (seconds) are recorded in it.
+        """
+        inputs = self._mail_inputs(job, links, tone, variant_id, user_name, company_name, summary, benefits)
+        stats = stats if stats is not None else {}
+        started = time.perf_counter()
+
+        key = None
+        if self.cache is not None and self.cache_variants:
+            key = self._cache_key(self.chain_email, inputs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                stats["time_to_first_token"] = stats["total"] = time.perf_counter() - started
+                tracer.add("llm.email_stream", stats["total"] * 1000, cached=True)
+                yield cached
+                return
+
+        parts = []
+        for chunk in self.scheduler.stream(lambda: self.chain_email.stream(inputs),
+                                           self._estimate_call_tokens(self.chain_email, inputs), INTERACTIVE):
+            if not chunk.content:
+                continue
+            if not parts:
+                stats["time_to_first_token"] = time.perf_counter() - started
+            parts.append(chunk.content)
+            yield chunk.content
+        stats["total"] = time.perf_counter() - started
+        tracer.add("llm.email_stream", stats["total"] * 1000, cached=False,
+                   time_to_first_token_ms=stats.get("time_to_first_token", stats["total"]) * 1000)
+
+        if key is not None and "".join(parts).strip():
+            self.cache.set(key, "".join(parts))
+
+    @staticmethod
+    def _mail_inputs(job, links, tone, variant_id, user_name, company_name, summary, benefits) -> Dict[str, Any]:
+        return {
+            "job_description": Job.from_dict(job).to_prompt(),
             "link_list": links,
             "tone": tone,
             "variant_id": variant_id,
@@ -192,5 +479,114 @@ class Chain:
             "company_name": company_name,
             "summary": summary,
             "benefits": benefits
-        })
-        return res.content
\ No newline at end of file
+        }
+
+    def write_mail_variants(self, job, links, variant_count=2, tone="Professional", user_name="Mohan",
+                            company_name="AtliQ", summary="", benefits="") -> List[str]:
+        """
+        Write variant_count emails for a job with a single LLM call returning them as JSON, so the
+        shared prompt is only sent once. Variants missing from an unparseable or short response
+        are written with individual write_mail calls. Returns the emails in variant order.
+        """
+        inputs = self._mail_inputs(job, links, tone, None, user_name, company_name, summary, benefits)
+        del inputs["variant_id"]
+        inputs["variant_count"] = variant_count
+        content = self._invoke_chain(self.chain_variants, inputs, use_cache=self.cache_variants,
+                                     stage="llm.email_variants", priority=INTERACTIVE,
+                                     validate=self._is_valid_json)
+
+        emails = {}
+        try:
+            emails = self._parse_variants(content, variant_count)
+        except OutputParserException as e:
+            print(f"Could not parse email variants, writing them one by one: {str(e)}")
+
+        for variant_id in range(1, variant_count + 1):
+            if variant_id not in emails:
+                emails[variant_id] = self.write_mail(job, links, tone, variant_id, user_name, company_name,
+                                                     summary, benefits)
+        return [emails[variant_id] for variant_id in range(1, variant_count + 1)]
+
+    def _parse_variants(self, content: str, variant_count: int) -> Dict[int, str]:
+        """Map variant_id to email for the usable variants in a write_mail_variants response."""
+        try:
+            parsed = self._parse_json_strict(content)
+        except OutputParserException:
+            # Salvage the complete variants; write_mail_variants writes the rest one by one
+            parsed, stats = recover_json_objects(content)
+            tracer.add("json_recovery", 0, **stats)
+            if not parsed:
+                raise
+        if isinstance(parsed, dict):
+            # Accept {"variants": [...]} or a single variant object
+            parsed = parsed.get("variants", parsed.get("emails", [parsed]))
+        if not isinstance(parsed, list):
+            raise OutputParserException(f"Expected a JSON array of variants, got {type(parsed).__name__}")
+
+        emails = {}
+        for position, item in enumerate(parsed, 1):
+            email = item.get("email") if isinstance(item, dict) else item
+            variant_id = item.get("variant_id", position) if isinstance(item, dict) else position
+            if not isinstance(email, str) or not email.strip():
+                continue
+            try:
+                variant_id = int(variant_id)
+            except (TypeError, ValueError):
+                variant_id = position
+            if variant_id in emails or not 1 <= variant_id <= variant_count:
+                variant_id = next((v for v in range(1, variant_count + 1) if v not in emails), None)
+            if variant_id is not None:
+                emails[variant_id] = email.strip()
+        return emails
+
+    def write_mails(self, jobs, links, variant_count=1, **mail_kwargs):
+        """
+        Generate variant_count emails for each job in parallel.
+        links holds the portfolio links for each job, in the same order as jobs.
+        With batch_variants, each job's variants come from one write_mail_variants call.
+        Yields (job_index, variant_id, email, error) tuples as soon as each email completes.
+        """
+        if self.batch_variants and variant_count > 1:
+            yield from self._write_mails_batched(jobs, links, variant_count, **mail_kwargs)
+            return
+
+        requests = [(job_idx, variant_id)
+                    for job_idx in range(len(jobs))
+                    for variant_id in range(1, variant_count + 1)]
+        if not requests:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(requests))) as executor:
+            futures = {
+                executor.submit(self.write_mail, jobs[job_idx], links[job_idx], variant_id=variant_id, **mail_kwargs):
+                    (job_idx, variant_id)
+                for job_idx, variant_id in requests
+            }
+            for future in as_completed(futures):
+                job_idx, variant_id = futures[future]
+                try:
+                    yield job_idx, variant_id, future.result(), None
+                except Exception as e:
+                    yield job_idx, variant_id, None, e
+
+    def _write_mails_batched(self, jobs, links, variant_count, **mail_kwargs):
+        """write_mails with one write_mail_variants call per job."""
+        if not jobs:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            futures = {
+                executor.submit(self.write_mail_variants, jobs[job_idx], links[job_idx], variant_count, **mail_kwargs):
+                    job_idx
+                for job_idx in range(len(jobs))
+            }
+            for future in as_completed(futures):
+                job_idx = futures[future]
+                try:
+                    emails = future.result()
+                except Exception as e:
+                    for variant_id in range(1, variant_count + 1):
+                        yield job_idx, variant_id, None, e
+                    continue
+                for variant_id, email in enumerate(emails, 1):
+                    yield job_idx, variant_id, email, None
@@ -0,0 +1,141 @@
+"""
+Near-duplicate detection for extracted jobs.
+
+Overlapping chunks make the LLM return the same posting several times with slightly
+different wording. Each job is turned into word shingles over its role, skills and
+description, summarised as a MinHash signature, and bucketed with banded LSH so that
+only jobs sharing a band are compared. Matching jobs are merged with union-find, which
+keeps the whole pass close to linear in the number of fragments.
+"""
+import re
+import zlib
+
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_TOKEN_RE = re.compile(r"[a-z0-9+#.]+")
+# Role words that make otherwise identical titles different postings
+SENIORITY_TOKENS = {"intern", "junior", "jr", "jr.", "associate", "mid", "senior", "sr", "sr.", "staff",
+                    "principal", "lead", "head", "i", "ii", "iii", "iv"}
+
+
+def _tokens(value):
+    """Lowercase word tokens of a string or a list of strings."""
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return _TOKEN_RE.findall(str(value or "").lower())
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class MinHasher:
+    """MinHash signatures over hashed shingles using (a * x + b) mod p permutations."""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        if not shingles:
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & _MERSENNE_PRIME for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+
+def job_shingles(job, size=3):
+    """Word n-grams of the job's description plus its role and skill tokens."""
+    role = _tokens(job.get("role"))
+    skills = _tokens(job.get("skills"))
+    description = _tokens(job.get("description"))
+    shingles = {" ".join(description[i:i + size]) for i in range(max(1, len(description) - size + 1))}
+    shingles.update("role:" + t for t in role)
+    shingles.update("skill:" + t for t in skills)
+    shingles.discard("")
+    return shingles
+
+
+def _same_role(a, b, role_threshold):
+    """Roles match when either is missing, or they share a seniority level and enough of their words."""
+    if not a or not b:
+        return True
+    return a & SENIORITY_TOKENS == b & SENIORITY_TOKENS and _jaccard(a, b) >= role_threshold
+
+
+def _is_empty(job):
+    return not (job.get("role") or job.get("description") or job.get("skills"))
+
+
+def _completeness(job):
+    skills = job.get("skills") or []
+    return len(str(job.get("description") or "")), len(skills) if isinstance(skills, list) else 1
+
+
+def _merge(group):
+    """Keep the most complete job of a duplicate group (a dict or a Job), with the union of the group's skills."""
+    best = max(group, key=_completeness)
+    if isinstance(best, dict):
+        best = dict(best)
+    if isinstance(best.get("skills"), list):
+        skills = list(best.get("skills"))
+        seen = {str(s).lower() for s in skills}
+        for job in group:
+            other_skills = job.get("skills")
+            for skill in other_skills if isinstance(other_skills, list) else []:
+                if str(skill).lower() not in seen:
+                    seen.add(str(skill).lower())
+                    skills.append(skill)
+        best = dict(best, skills=skills) if isinstance(best, dict) else best.replace(skills=skills)
+    return best
+
+
+def deduplicate_jobs(jobs, threshold=0.6, num_perm=64, bands=16, role_threshold=0.5):
+    """
+    Merge near-duplicate jobs and return one job per posting, in order of first appearance.
+    Jobs are duplicates when their estimated shingle similarity is at least threshold and their
+    roles (when both have one) share at least role_threshold of their words and the same seniority
+    words (junior, senior, lead, II, ...), so "Junior" and "Senior" postings stay apart. Only entirely empty
+    fragments are dropped; jobs without a role are kept.
+    """
+    groups = duplicate_groups(jobs, threshold, num_perm, bands, role_threshold)
+    return [_merge([jobs[i] for i in group]) for group in groups]
+
+
+def duplicate_groups(jobs, threshold=0.6, num_perm=64, bands=16, role_threshold=0.5):
+    """Group the indices of near-duplicate jobs, in order of first appearance; empty jobs are left out."""
+    indices = [i for i, job in enumerate(jobs) if hasattr(job, "get") and not _is_empty(job)]
+    if len(indices) < 2:
+        return [[i] for i in indices]
+
+    hasher = MinHasher(num_perm)
+    signatures = np.vstack([hasher.signature(job_shingles(jobs[i])) for i in indices])
+    roles = [set(_tokens(jobs[i].get("role"))) for i in indices]
+
+    parent = list(range(len(indices)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = num_perm // bands
+    for band in range(bands):
+        buckets = {}
+        for i, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            # Compare with the bucket's first job only; union-find makes matches transitive
+            head = buckets.setdefault(key, i)
+            if head == i or find(head) == find(i):
+                continue
+            similarity = float(np.mean(signatures[head] == signatures[i]))
+            if similarity >= threshold and _same_role(roles[head], roles[i], role_threshold):
+                parent[find(i)] = find(head)
+
+    groups = {}
+    for i in range(len(indices)):
+        groups.setdefault(find(i), []).append(indices[i])
+    return list(groups.values())
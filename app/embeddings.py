@@ -0,0 +1,139 @@
+"""
+Local embedding functions for the portfolio vector store, with a persistent embedding cache.
+
+SMARTREACH_EMBEDDING_MODEL picks the model:
+
+- all-MiniLM-L6-v2 (default): Chroma's bundled ONNX MiniLM, batched on the CPU; the same
+  vectors Chroma's default embedding function produces, so existing vector stores stay valid
+- hash: deterministic bag-of-words vectors that need no model files (offline use, benchmarks)
+- any other name: a sentence-transformers model run on the CPU; needs sentence-transformers
+
+Embeddings are cached in SQLite by a hash of the model name and the text, so rebuilding the
+vector store or querying the same skills again never re-embeds text the model has seen.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from tracing import span
+from utils import select_in
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite"
+
+
+class HashEmbeddingFunction:
+    """Cheap deterministic bag-of-words embedding that runs anywhere."""
+
+    def __init__(self, dimensions=64):
+        self.dimensions = dimensions
+        self.model_name = "hash" if dimensions == 64 else f"hash-{dimensions}"
+
+    def __call__(self, input):
+        embeddings = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for word in text.lower().replace(",", " ").split():
+                vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1.0
+            norm = sum(v * v for v in vector) ** 0.5 or 1.0
+            embeddings.append([v / norm for v in vector])
+        return embeddings
+
+
+def create_embedding_function(model=None):
+    """Build the local embedding function for model, or for SMARTREACH_EMBEDDING_MODEL when not given."""
+    model = model or os.getenv("SMARTREACH_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+    if model == "hash":
+        return HashEmbeddingFunction()
+    if model == DEFAULT_EMBEDDING_MODEL:
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        return ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+    try:
+        from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+
+        return SentenceTransformerEmbeddingFunction(model_name=model, device="cpu")
+    except ImportError:
+        raise ImportError(f"Embedding model '{model}' requires sentence-transformers: pip install sentence-transformers")
+
+
+def embedding_model_name(embedding_function):
+    """Name of the model behind an embedding function, for keying stored vectors."""
+    return (getattr(embedding_function, "model_name", None) or getattr(embedding_function, "MODEL_NAME", None)
+            or type(embedding_function).__name__)
+
+
+class CachedEmbeddingFunction:
+    """
+    Chroma embedding function that serves known texts from a SQLite cache keyed on
+    (model, sha256 of the text) and embeds the rest in batches of batch_size.
+    """
+
+    def __init__(self, embedding_function, model_name, path=EMBEDDING_CACHE_PATH, batch_size=64):
+        self.embedding_function = embedding_function
+        self.model_name = model_name
+        self.path = path
+        self.batch_size = batch_size  # Texts per call into the model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                content_hash TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def __call__(self, input):
+        keys = [self._key(text) for text in input]
+        vectors = self._load(set(keys))
+
+        missing = list(dict.fromkeys(text for text, key in zip(input, keys) if key not in vectors))
+        with self._lock:
+            self.hits += len(input) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            with span("embed", texts=len(missing), cached=len(input) - len(missing)):
+                computed = {}
+                for start in range(0, len(missing), self.batch_size):
+                    batch = missing[start:start + self.batch_size]
+                    for text, vector in zip(batch, self.embedding_function(batch)):
+                        computed[self._key(text)] = np.asarray(vector, dtype=np.float32)
+            self._store(computed)
+            vectors.update(computed)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def _load(self, keys):
+        with self._lock:
+            rows = select_in(self._conn,
+                             "SELECT content_hash, vector FROM embeddings WHERE content_hash IN ({placeholders})", keys)
+        return {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+
+    def _store(self, vectors):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_hash, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in vectors.items()]
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"entries": count, "hits": self.hits, "misses": self.misses}
+
+
+def get_embedding_function(model=None, cache_path=EMBEDDING_CACHE_PATH, batch_size=64):
+    """The configured local embedding function behind the persistent embedding cache."""
+    model = model or os.getenv("SMARTREACH_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+    return CachedEmbeddingFunction(create_embedding_function(model), model, cache_path, batch_size)
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from bs4.element import CData, NavigableString
+
+from tracing import span
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+PAGE_CACHE_DIR = "page_cache"
+BOILERPLATE_TAGS = {"script", "style", "header", "footer", "nav"}
+MIN_CONTENT_LENGTH = 1000  # Below this, boilerplate text is kept as well
+RENDER_MODES = ("auto", "always", "never")  # When fetch_text_safely renders pages in a headless browser
+JS_REQUIRED_MARKERS = (b"enable javascript", b"requires javascript", b"javascript is required",
+                       b'id="root"></div>', b'id="app"></div>', b'id="__next"></div>')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared keep-alive HTTP session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+class PageCache:
+    """On-disk cache of fetched pages with the validators needed for conditional requests."""
+
+    def __init__(self, directory=PAGE_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".html", base + ".json"
+
+    def load(self, url):
+        """Return (body, metadata) for url, or (None, None) if it has not been cached."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                metadata = json.load(f)
+            with open(body_path, "rb") as f:
+                return f.read(), metadata
+        except (OSError, ValueError):
+            return None, None
+
+    def store(self, url, body, headers):
+        body_path, meta_path = self._paths(url)
+        metadata = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time()
+        }
+        # Write to temporary files first so concurrent readers never see a partial page
+        with open(body_path + ".tmp", "wb") as f:
+            f.write(body)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(body_path + ".tmp", body_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+
+_page_cache = None
+
+
+def get_page_cache():
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache()
+    return _page_cache
+
+
+def fetch_html(url, timeout=15, use_cache=True):
+    """
+    Download url through the shared session and return the raw bytes.
+    Cached pages are revalidated with If-None-Match/If-Modified-Since and reused on a 304.
+    """
+    cache = get_page_cache() if use_cache else None
+    cached_body, metadata = cache.load(url) if cache else (None, None)
+
+    headers = {}
+    if cached_body is not None:
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+    response = get_session().get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached_body is not None:
+        return cached_body
+    response.raise_for_status()  # Raise exception for 4XX/5XX status codes
+
+    if cache:
+        cache.store(url, response.content, response.headers)
+    return response.content
+
+
+def html_to_text(html, parser=HTML_PARSER):
+    """
+    Extract visible text from HTML in a single parse.
+    Text inside script, style, header, footer and nav is skipped unless the remaining
+    content is too short, in which case the whole page's text is returned instead.
+    """
+    soup = BeautifulSoup(html, parser)
+    content_parts = []
+    all_parts = []
+    for node in soup.descendants:
+        # Same string types as get_text(): skips comments, doctypes and script/style contents
+        if type(node) not in (NavigableString, CData):
+            continue
+        text = node.strip()
+        if not text:
+            continue
+        all_parts.append(text)
+        if not any(parent.name in BOILERPLATE_TAGS for parent in node.parents):
+            content_parts.append(text)
+
+    page_text = " ".join(content_parts)
+    if len(page_text) < MIN_CONTENT_LENGTH:
+        page_text = " ".join(all_parts)
+    return page_text
+
+
+def looks_incomplete(html, text):
+    """Completeness heuristic: True when a static fetch probably misses content that JavaScript adds."""
+    if len(text) < MIN_CONTENT_LENGTH:
+        return True
+    head = html[:200000].lower()
+    return len(text) < 3 * MIN_CONTENT_LENGTH and any(marker in head for marker in JS_REQUIRED_MARKERS)
+
+
+def _parse_text(html):
+    with span("parse", bytes=len(html)):
+        try:
+            return html_to_text(html)
+        except Exception:
+            # Fall back to the pure-Python parser on the bytes we already have
+            return html_to_text(html, parser="html.parser")
+
+
+def fetch_text_safely(url, render=None):
+    """
+    Safely fetch text from a URL with better error handling.
+    render is "auto" (render in a headless browser only when the static page looks incomplete),
+    "always" or "never"; it defaults to SMARTREACH_RENDER, else "auto". Rendering is skipped
+    quietly when no browser is available.
+    """
+    render = render or os.getenv("SMARTREACH_RENDER", "auto")
+    if render not in RENDER_MODES:
+        return None, f"Unknown render mode '{render}'. Use one of: {', '.join(RENDER_MODES)}"
+
+    text = None
+    if render != "always":
+        with span("fetch", url=url) as attrs:
+            try:
+                html = fetch_html(url)
+            except (requests.exceptions.RequestException, OSError) as e:
+                attrs["error"] = str(e)
+                return None, f"Failed to access URL: {str(e)}"
+            attrs["bytes"] = len(html)
+        try:
+            text = _parse_text(html)
+        except Exception as e:
+            return None, f"Error fetching URL content: {str(e)}"
+        if render == "never" or not looks_incomplete(html, text):
+            return text, None
+
+    from renderer import RenderUnavailable, render_html  # Imported lazily: selenium is optional
+
+    try:
+        rendered_text = _parse_text(render_html(url))
+    except RenderUnavailable as e:
+        if text is None:
+            return None, f"Could not render URL: {str(e)}"
+        print(f"Rendering skipped for {url}: {str(e)}")
+        return text, None
+    except Exception as e:
+        if text is None:
+            return None, f"Failed to render URL: {str(e)}"
+        print(f"Rendering failed for {url}, using the static page: {str(e)}")
+        return text, None
+    # Keep the static text if rendering somehow produced less
+    return (rendered_text if text is None or len(rendered_text) >= len(text) else text), None
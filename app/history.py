@@ -0,0 +1,124 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from tracing import span
+
+
+class EmailHistory:
+    """
+    Append-optimized store of generated emails in SQLite (WAL mode).
+    Writes are buffered and flushed in batches; an email for the same job, variant and
+    content is only ever stored once, so re-rendering the same results is a no-op.
+    """
+
+    def __init__(self, path="email_history.sqlite", batch_size=20, legacy_csv="email_history.csv"):
+        self.path = path
+        self.batch_size = batch_size  # Buffered emails per write transaction
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS emails (
+                id INTEGER PRIMARY KEY,
+                content_hash TEXT NOT NULL UNIQUE,
+                date TEXT NOT NULL,
+                role TEXT,
+                experience TEXT,
+                skills TEXT,
+                tone TEXT,
+                variant INTEGER,
+                email TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_date ON emails (date)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_role ON emails (role)")
+        self._conn.commit()
+
+        if legacy_csv and os.path.exists(legacy_csv) and not self.count():
+            self._import_csv(legacy_csv)
+        atexit.register(self.flush)
+
+    @staticmethod
+    def content_hash(job, variant_num, email):
+        payload = json.dumps({"job": job, "variant": variant_num, "email": email}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def add(self, job, email, variant_num=None, tone=None):
+        """Buffer an email for writing; flushes automatically once batch_size emails are pending."""
+        if hasattr(job, "to_dict"):
+            job = job.to_dict()
+        skills = job.get("skills", [])
+        row = (
+            self.content_hash(job, variant_num, email),
+            datetime.now().strftime("%Y-%m-%d %H:%M"),
+            job.get("role", "N/A"),
+            job.get("experience", "N/A"),
+            ", ".join(skills) if isinstance(skills, list) else str(skills),
+            tone,
+            variant_num,
+            email
+        )
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) < self.batch_size:
+                return
+        self.flush()
+
+    def flush(self):
+        """Write buffered emails in one transaction, ignoring ones already stored."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            with span("history_write", rows=len(rows)):
+                self._conn.executemany("""
+                    INSERT OR IGNORE INTO emails (content_hash, date, role, experience, skills, tone, variant, email)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                self._conn.commit()
+
+    def count(self, role=None):
+        query, params = "SELECT COUNT(*) FROM emails", ()
+        if role:
+            query, params = query + " WHERE role = ?", (role,)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def page(self, page=0, page_size=20, role=None):
+        """Return one page of history, newest first, as a DataFrame."""
+        query = "SELECT date, role, experience, skills, tone, variant, email FROM emails"
+        params = []
+        if role:
+            query += " WHERE role = ?"
+            params.append(role)
+        query += " ORDER BY date DESC, id DESC LIMIT ? OFFSET ?"
+        params += [page_size, page * page_size]
+        with self._lock:
+            return pd.read_sql_query(query, self._conn, params=params)
+
+    def _import_csv(self, csv_path):
+        """One-time import of the old email_history.csv format."""
+        legacy = pd.read_csv(csv_path).fillna("")
+        rows = [
+            (
+                self.content_hash({"role": r["role"], "experience": r["experience"], "skills": r["skills"]},
+                                  None, r["email"]),
+                r["date"], r["role"], r["experience"], r["skills"], None, None, r["email"]
+            )
+            for r in legacy.to_dict("records")
+        ]
+        with self._lock:
+            self._conn.executemany("""
+                INSERT OR IGNORE INTO emails (content_hash, date, role, experience, skills, tone, variant, email)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            self._conn.commit()
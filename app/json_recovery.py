@@ -0,0 +1,99 @@
+"""
+Salvage JSON objects from malformed LLM output.
+
+Extraction responses that fail strict parsing are usually a valid array with a preamble,
+a code fence or trailing prose around it, or an array cut off mid-object when the model
+hit its token limit. recover_json_objects scans the text once, tracking brackets and
+string state, and parses each complete array element as soon as its closing brace is
+seen. Every character is scanned once and every element span is parsed once, so the
+cost stays linear in the length of the response however broken it is.
+"""
+import json
+import re
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_CLOSING = {"}": "{", "]": "["}
+_COLLECTING = ("array", "wrapper")  # Container roles whose object children are collected
+
+
+def _loads(span):
+    """Parse an object span, tolerating trailing commas; None if it is not valid JSON."""
+    for candidate in (span, _TRAILING_COMMA_RE.sub(r"\1", span)):
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def recover_json_objects(text):
+    """
+    Return (objects, stats) for the JSON objects that can be recovered from text.
+    Objects are the elements of top-level arrays, or of the array in a top-level wrapper object
+    such as {"jobs": [...]}: an object whose only member is an array of objects. Any other
+    array belongs to its object, and a wrapper with no complete elements is returned as an
+    object itself. When the text has no such array, complete top-level objects are returned.
+    stats counts the objects "recovered" and "lost" (unparseable, cut off, or left in an
+    unterminated container), and "truncated" is True when the scan ends inside a container
+    or a string.
+    """
+    elements = []  # Parsed array elements, None where an element could not be parsed
+    wrapped = []  # Parsed elements of the open top-level object's array, kept once it proves a wrapper
+    top_level = []  # (start, end) spans of top-level objects that are not wrappers
+    stack = []  # (opening character, start index, role) of the open containers
+    wrapper = False  # The open top-level object may still be a wrapper: one member, an array of objects
+    members = 0  # Commas seen directly inside the open top-level object
+    in_string = escaped = False
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"' or (char == "\n" and not stack):
+                # A quote in prose outside any container ends with its line at the latest
+                in_string = False
+            continue
+
+        if stack and stack[-1][2] == "wrapper" and char not in "{,]" and not char.isspace():
+            wrapper = False  # A value that is not an object: the array is a field of a single record
+        if char == '"':
+            in_string = True
+        elif char in "[{":
+            role = None
+            if not stack:
+                role = "array" if char == "[" else "object"
+                wrapper, members, wrapped = False, 0, []
+            elif stack[-1][2] in _COLLECTING:
+                role = "element" if char == "{" else None
+            elif stack[-1][2] == "object" and len(stack) == 1 and char == "[" and not members:
+                role, wrapper = "wrapper", True
+            stack.append((char, i, role))
+        elif char == "," and len(stack) == 1 and stack[0][2] == "object":
+            members += 1
+            wrapper = False  # The object has more members than its array, so it is a record
+        elif char in _CLOSING and stack and stack[-1][0] == _CLOSING[char]:
+            _, start, role = stack.pop()
+            if role == "element":
+                (wrapped if stack[-1][2] == "wrapper" else elements).append(_loads(text[start:i + 1]))
+            elif role == "object":
+                if wrapper and wrapped:
+                    elements.extend(wrapped)
+                else:
+                    top_level.append((start, i + 1))
+        # Anything else outside a container is preamble or trailing prose; unmatched closers are ignored
+
+    if stack and stack[0][2] == "object" and wrapper:
+        elements.extend(wrapped)  # A wrapper cut off after its array or inside it
+    truncated = bool(stack) or in_string
+    if elements or any(role == "element" for _, _, role in stack):
+        objects = [element for element in elements if element is not None]
+        lost = len(elements) - len(objects)
+    else:
+        parsed = [_loads(text[start:end]) for start, end in top_level]
+        objects = [value for value in parsed if value is not None]
+        lost = len(parsed) - len(objects)
+    lost += truncated
+    return objects, {"recovered": len(objects), "lost": lost, "truncated": truncated}
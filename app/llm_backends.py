@@ -0,0 +1,156 @@
+"""
+Registry of chat model backends used by Chain.
+
+The backend is chosen with the LLM_BACKEND environment variable (default "groq"):
+
+- groq:   Groq cloud (GROQ_API_KEY)
+- openai: any OpenAI-compatible endpoint (OPENAI_BASE_URL, OPENAI_API_KEY); needs langchain-openai
+- fake:   deterministic local stub for offline load testing (FAKE_LLM_LATENCY, FAKE_LLM_FAILURE_RATE)
+
+LLM_MODEL and LLM_TEMPERATURE override the model name and temperature of the real backends.
+LLM_RPM and LLM_TPM set the requests/tokens-per-minute budget Chain schedules calls within
+(defaults per backend in DEFAULT_RATE_LIMITS; 0 means unlimited).
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_BACKEND = "groq"
+LLM_BACKENDS = {}
+DEFAULT_RATE_LIMITS = {"groq": (30, 6000)}  # (requests, tokens) per minute on Groq's free tier
+
+FAKE_ROLES = ["Python Developer", "Frontend Engineer", "Data Scientist", "DevOps Engineer",
+              "Machine Learning Engineer", "Backend Engineer", "QA Analyst", "Product Designer"]
+FAKE_SKILLS = ["Python", "React", "Node.js", "AWS", "Docker", "Kubernetes", "SQL", "Django",
+               "TensorFlow", "TypeScript", "Go", "PostgreSQL"]
+
+
+def register_backend(name):
+    """Register a factory that builds a chat model for the given backend name."""
+    def decorator(factory):
+        LLM_BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def create_llm(backend=None, **options):
+    """Build the chat model for backend, or for LLM_BACKEND when backend is not given."""
+    name = backend or os.getenv("LLM_BACKEND", DEFAULT_BACKEND)
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Available: {', '.join(sorted(LLM_BACKENDS))}")
+    return LLM_BACKENDS[name](**options)
+
+
+def rate_limits(backend=None):
+    """(requests_per_minute, tokens_per_minute) for backend, from LLM_RPM/LLM_TPM or the backend's default."""
+    default_rpm, default_tpm = DEFAULT_RATE_LIMITS.get(backend or os.getenv("LLM_BACKEND", DEFAULT_BACKEND), (0, 0))
+    return int(os.getenv("LLM_RPM", default_rpm)), int(os.getenv("LLM_TPM", default_tpm))
+
+
+@register_backend("groq")
+def _groq_backend(timeout=None):
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(temperature=float(os.getenv("LLM_TEMPERATURE", "0.7")),
+                    groq_api_key=os.getenv("GROQ_API_KEY"),
+                    model_name=os.getenv("LLM_MODEL", "llama-3.1-8b-instant"),
+                    request_timeout=timeout,
+                    max_retries=0)  # Chain's scheduler retries 429s, 5xx and connection errors
+
+
+@register_backend("openai")
+def _openai_backend(timeout=None):
+    try:
+        from langchain_openai import ChatOpenAI
+    except ImportError:
+        raise ImportError("The 'openai' LLM backend requires langchain-openai: pip install langchain-openai")
+
+    return ChatOpenAI(temperature=float(os.getenv("LLM_TEMPERATURE", "0.7")),
+                      api_key=os.getenv("OPENAI_API_KEY", "not-needed"),
+                      base_url=os.getenv("OPENAI_BASE_URL"),
+                      model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
+                      timeout=timeout,
+                      max_retries=0)  # Chain's scheduler retries 429s, 5xx and connection errors
+
+
+@register_backend("fake")
+def _fake_backend(timeout=None):
+    return FakeLLM(latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+                   failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")))
+
+
+class FakeRateLimitError(Exception):
+    """Simulated provider rate-limit error raised by FakeLLM."""
+
+
+class FakeLLM(BaseChatModel):
+    """
+    Offline chat model returning canned responses.
+    Extraction prompts get a JSON array of jobs, multi-variant email prompts a JSON array of emails
+    and other email prompts a short email, all derived deterministically from the prompt. Calls can be slowed down and made to fail at random.
+    """
+
+    model_name: str = "fake-llm"
+    latency: float = 0.0  # Seconds per call
+    failure_rate: float = 0.0  # Probability that a call raises FakeRateLimitError
+    jobs_per_response: int = 3
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self._simulate_call(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(messages)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        words = self._respond(messages).split(" ")
+        # Spend a fifth of the latency before the first token and spread the rest over the words
+        self._simulate_call(self.latency * 0.2)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.latency * 0.8 / len(words))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+    def _simulate_call(self, delay: float):
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise FakeRateLimitError("Error code: 429 - rate limit exceeded (simulated)")
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content if messages else ""
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        if "JSON" in prompt and "SCRAPED TEXT" in prompt:
+            return json.dumps([self._job(seed + i) for i in range(self.jobs_per_response)])
+        if "JSON" in prompt and "EMAIL VARIANTS" in prompt:
+            match = re.search(r"Write (\d+) different versions", prompt)
+            count = int(match.group(1)) if match else 1
+            return json.dumps([{"variant_id": i + 1, "email": self._email(seed + i)} for i in range(count)])
+        return self._email(seed)
+
+    def _email(self, seed: int) -> str:
+        role = FAKE_ROLES[seed % len(FAKE_ROLES)]
+        return (f"Subject: Helping you hire a {role}\n\n"
+                f"Hi there,\n\nWe noticed you are looking for a {role}. Our team has delivered similar "
+                f"projects and can start quickly.\n\nBest regards")
+
+    def _job(self, seed: int) -> dict:
+        skills = [FAKE_SKILLS[(seed // 7 + k) % len(FAKE_SKILLS)] for k in range(3)]
+        role = FAKE_ROLES[seed % len(FAKE_ROLES)]
+        return {
+            "role": role,
+            "experience": f"{seed % 8 + 1}+ years",
+            "skills": skills,
+            "description": f"We are hiring a {role} experienced with {', '.join(skills)}."
+        }
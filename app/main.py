@@ -1,16 +1,22 @@
 import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
 from chains import Chain
+from fetcher import fetch_text_safely
 from portfolio import Portfolio
+from history import EmailHistory
+from models import Job
+from snapshots import SnapshotStore
+from tasks import TaskQueue
+from tracing import tracer
 from utils import clean_text, extract_jobs_summary
-import pandas as pd
-import os
-from datetime import datetime
-import traceback
-import requests
-from bs4 import BeautifulSoup
+import time
+from functools import partial
 
-EMAIL_HISTORY_PATH = "email_history.csv"
+EMAIL_HISTORY_PATH = "email_history.sqlite"
+SNAPSHOT_PATH = "snapshots.sqlite"
+TASK_QUEUE_PATH = "tasks.sqlite"
+TASK_WORKERS = 4  # Background tasks running at once, shared by all sessions
+TASK_POLL_INTERVAL = 0.5  # Seconds between reruns while a task is in progress
+HISTORY_PAGE_SIZE = 20
 
 # Set page configuration and theme
 st.set_page_config(
@@ -172,18 +178,8 @@ def load_css():
     </style>
     """, unsafe_allow_html=True)
 
-def save_email_history(job, email):
-    df = pd.DataFrame([{
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-        "role": job.get("role", "N/A"),
-        "experience": job.get("experience", "N/A"),
-        "skills": ", ".join(job.get("skills", [])),
-        "email": email
-    }])
-    if os.path.exists(EMAIL_HISTORY_PATH):
-        df.to_csv(EMAIL_HISTORY_PATH, mode='a', header=False, index=False)
-    else:
-        df.to_csv(EMAIL_HISTORY_PATH, index=False)
+def save_email_history(job, email, variant_num=None, tone=None):
+    get_email_history().add(job, email, variant_num=variant_num, tone=tone)
 
 def display_job_card(job, index):
     with st.container():
@@ -200,14 +196,21 @@ def display_job_card(job, index):
         """, unsafe_allow_html=True)
         return st.checkbox(f"✅ Select this job", key=f"select_{index}")
 
-def display_email_variant(email, job, variant_num, tone, export_enabled):
+def display_email_variant(email, job, variant_num, tone, export_enabled, timing=None):
+    """Render an email variant; email may be a string or an iterator of streamed text pieces."""
     with st.container():
         st.markdown(f"""
         <div class="email-variant">
             <h4>✉️ Email Variant {variant_num} - {tone} Tone</h4>
         </div>
         """, unsafe_allow_html=True)
-        st.code(email, language='markdown')
+        if isinstance(email, str):
+            st.code(email, language='markdown')
+        else:
+            email = render_email_stream(email)
+        if timing and "total" in timing:
+            st.caption(f"⏱️ First token {timing.get('time_to_first_token', timing['total']):.2f}s · "
+                       f"total {timing['total']:.2f}s")
         
         col1, col2 = st.columns([4, 1])
         with col2:
@@ -219,49 +222,141 @@ def display_email_variant(email, job, variant_num, tone, export_enabled):
             )
         
         if export_enabled:
-            save_email_history(job, email)
-
-def fetch_text_safely(url):
-    """Safely fetch text from a URL with better error handling."""
-    try:
-        # First try with requests + Beautiful Soup for better HTML handling
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()  # Raise exception for 4XX/5XX status codes
-        
-        # Use Beautiful Soup to extract text content
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script_or_style in soup(['script', 'style', 'header', 'footer', 'nav']):
-            script_or_style.extract()
-            
-        # Get text content
-        page_text = soup.get_text(separator=' ', strip=True)
-        
-        # If the content is too small, we might not have gotten everything, so try LangChain's loader
-        if len(page_text) < 1000:
-            loader = WebBaseLoader([url])
-            docs = loader.load()
-            if docs:
-                page_text = docs[0].page_content
-                
-        return page_text, None
-        
-    except requests.exceptions.RequestException as e:
-        return None, f"Failed to access URL: {str(e)}"
-    except Exception as e:
-        try:
-            # Fallback to LangChain's WebBaseLoader if requests+BS4 fails
-            loader = WebBaseLoader([url])
-            docs = loader.load()
-            if docs:
-                return docs[0].page_content, None
-            else:
-                return None, "Failed to extract content from the URL"
-        except Exception as fallback_e:
-            return None, f"Error fetching URL content: {str(fallback_e)}"
+            save_email_history(job, email, variant_num, tone)
+
+def render_email_stream(pieces, refresh_interval=0.05):
+    """Show streamed email text live as it arrives and return the full text."""
+    placeholder = st.empty()
+    text = ""
+    last_refresh = 0.0
+    for piece in pieces:
+        text += piece
+        now = time.perf_counter()
+        if now - last_refresh >= refresh_interval:
+            placeholder.code(text + "▌", language='markdown')
+            last_refresh = now
+    placeholder.code(text, language='markdown')
+    return text
+
+@st.cache_resource
+def get_chain():
+    """Build the LLM chain once per server process and share it across reruns and sessions."""
+    started = time.perf_counter()
+    chain = Chain()
+    elapsed = time.perf_counter() - started
+    print(f"Chain initialized in {elapsed * 1000:.0f} ms")
+    return chain, elapsed
+
+@st.cache_resource
+def get_portfolio():
+    """Open the portfolio vector store and load it once per server process."""
+    started = time.perf_counter()
+    portfolio = Portfolio()
+    portfolio.load_portfolio()
+    elapsed = time.perf_counter() - started
+    print(f"Portfolio initialized in {elapsed * 1000:.0f} ms")
+    return portfolio, elapsed
+
+@st.cache_resource
+def get_email_history():
+    """Open the email history store once per server process."""
+    return EmailHistory(EMAIL_HISTORY_PATH)
+
+@st.cache_resource
+def get_snapshot_store():
+    """Open the page snapshot store used for incremental re-scrapes once per server process."""
+    return SnapshotStore(SNAPSHOT_PATH)
 
-def create_streamlit_app(llm, portfolio, clean_text):
+def run_scrape_task(llm, portfolio, payload, report):
+    """Background task: fetch, clean and extract jobs from payload["url"]."""
+    report(0.1, "Step 1/3: Fetching page content...")
+    content, fetch_error = fetch_text_safely(payload["url"], render=payload.get("render"))
+    if fetch_error:
+        raise RuntimeError(fetch_error)
+
+    report(0.4, "Step 2/3: Cleaning and processing text...")
+    cleaned_data = clean_text(content)
+
+    report(0.6, "Step 3/3: Extracting job information...")
+    # Sync portfolio (a no-op unless the CSV changed) and extract jobs
+    portfolio.load_portfolio()
+    # Stats come back with this page's jobs; the chain is shared by every session
+    incremental_report = chunk_stats = None
+    if payload.get("incremental"):
+        jobs, incremental_report = llm.extract_jobs_incremental(payload["url"], cleaned_data, get_snapshot_store())
+    else:
+        jobs, chunk_stats = llm.extract_jobs(cleaned_data, with_stats=True)
+    return {
+        "jobs": [job.to_dict() for job in jobs],
+        "incremental_report": incremental_report,
+        "chunk_stats": chunk_stats,
+        "content_length": len(content),
+        "cleaned_length": len(cleaned_data)
+    }
+
+def run_generate_task(llm, portfolio, payload, report):
+    """Background task: write every email variant for payload["jobs"], publishing each one as it completes."""
+    jobs, variant_count = payload["jobs"], payload["variant_count"]
+    # Look up links for all selected jobs at once, embedding shared skills only once
+    job_links = portfolio.query_links_batch([job.get('skills', []) for job in jobs])
+    emails = [[None] * variant_count for _ in jobs]
+    errors = [[None] * variant_count for _ in jobs]
+    total = len(jobs) * variant_count
+    done = 0
+    for job_idx, variant_id, email, error in llm.write_mails(jobs, job_links, variant_count, **payload["settings"]):
+        if error:
+            errors[job_idx][variant_id-1] = str(error)
+        else:
+            emails[job_idx][variant_id-1] = email
+        done += 1
+        report(done / total, f"{done}/{total} emails written", {"emails": emails, "errors": errors})
+    return {"emails": emails, "errors": errors}
+
+@st.cache_resource
+def get_task_queue(_llm, _portfolio):
+    """Start the background worker pool once per server process; it is shared by every session."""
+    return TaskQueue(TASK_QUEUE_PATH, max_workers=TASK_WORKERS, handlers={
+        "scrape": partial(run_scrape_task, _llm, _portfolio),
+        "generate": partial(run_generate_task, _llm, _portfolio)
+    })
+
+def scrape_error_message(task, debug_mode):
+    """User-facing message for a failed scrape task."""
+    if debug_mode:
+        return f"Error details: {task['error']}\n\nStack trace: {task['traceback']}"
+    if "Context too big" in (task["error"] or ""):
+        return "Context too big. Unable to parse jobs. The page content is too large to process at once."
+    return f"An error occurred: {task['error']}"
+
+def display_timings(timings):
+    """Show one-time startup costs next to the cost of the current rerun."""
+    rerun_ms = (time.perf_counter() - timings["rerun_started"]) * 1000
+    st.markdown(f"""
+    <div class="info-container">
+        <h4>Debug Info: Timing</h4>
+        <p>Startup (once per process): Chain {timings['chain_init'] * 1000:.0f} ms, Portfolio {timings['portfolio_init'] * 1000:.0f} ms</p>
+        <p>This rerun: resource lookup {timings['resources'] * 1000:.1f} ms, total {rerun_ms:.0f} ms</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+def display_performance_panel():
+    """Show per-stage latency recorded by the tracer since the server started."""
+    stats = tracer.stage_stats()
+    if not stats:
+        st.caption("No pipeline stages recorded yet.")
+        return
+    st.dataframe(
+        [{key: round(value, 1) if isinstance(value, float) else value for key, value in s.items()} for s in stats],
+        column_config={"stage": "Stage", "count": "Calls", "errors": "Errors",
+                       "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)", "total_ms": "Total (ms)"},
+        hide_index=True
+    )
+    st.download_button("📥 Export Metrics", data=tracer.export_prometheus(), file_name="smartreach_metrics.prom",
+                       use_container_width=True)
+    if st.button("Reset Metrics"):
+        tracer.reset()
+
+def create_streamlit_app(llm, portfolio, clean_text, timings=None):
     load_css()
     
     # App Header
@@ -276,6 +371,8 @@ def create_streamlit_app(llm, portfolio, clean_text):
         email_tone = st.selectbox("Tone", ["Professional", "Friendly", "Casual", "Enthusiastic", "Formal"])
         variant_count = st.slider("Number of Variants", 1, 5, 2)
         export_enabled = st.checkbox("Save to Email History", value=True)
+        stream_enabled = st.checkbox("Stream emails as they are written", value=False,
+                                     help="Show each email word by word. Variants are then generated one at a time.")
         
         st.markdown('<div class="sidebar-header">🏢 Company Information</div>', unsafe_allow_html=True)
         user_name = st.text_input("Your Name", value="Prashant")
@@ -294,19 +391,30 @@ def create_streamlit_app(llm, portfolio, clean_text):
             )
         
         st.markdown('<div class="sidebar-header">📊 Analytics</div>', unsafe_allow_html=True)
-        if os.path.exists(EMAIL_HISTORY_PATH):
-            if st.button("View Email History"):
-                history = pd.read_csv(EMAIL_HISTORY_PATH)
+        email_history = get_email_history()
+        history_count = email_history.count()
+        if history_count:
+            with st.expander(f"View Email History ({history_count})"):
+                page_count = (history_count - 1) // HISTORY_PAGE_SIZE + 1
+                page = st.number_input("Page", min_value=1, max_value=page_count, value=1) - 1
+                history = email_history.page(page, HISTORY_PAGE_SIZE)
                 st.dataframe(
                     history[["date", "role"]],
                     column_config={"date": "Date", "role": "Job Role"},
                     hide_index=True
                 )
 
+        with st.expander("⏱️ Performance"):
+            display_performance_panel()
+
         # Advanced Options
         st.markdown('<div class="sidebar-header">🔧 Advanced</div>', unsafe_allow_html=True)
         with st.expander("Debug Options"):
             debug_mode = st.checkbox("Enable Debug Mode", value=False)
+            incremental = st.checkbox("Incremental re-scrape", value=False,
+                                      help="Only re-extract the parts of a page that changed since it was last scraped")
+            render_mode = st.selectbox("Render JavaScript pages", ["auto", "always", "never"],
+                                       help="Load pages in a headless browser: only when the plain fetch looks empty, always, or never")
 
     # Main content area
     if "submitted" not in st.session_state:
@@ -338,76 +446,43 @@ def create_streamlit_app(llm, portfolio, clean_text):
         </div>
         """, unsafe_allow_html=True)
     
+    task_queue = get_task_queue(llm, portfolio)
     if scrape_button:
         if not url_input:
             st.error("Please enter a valid URL")
         else:
             st.session_state["loading"] = True
             st.session_state["error"] = None  # Reset any previous errors
-            
-            # Create a progress bar
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            try:
-                # Step 1: Fetch the content
-                status_text.text("Step 1/3: Fetching page content...")
-                progress_bar.progress(10)
-                
-                content, fetch_error = fetch_text_safely(url_input)
-                if fetch_error:
-                    st.session_state["error"] = fetch_error
-                    st.session_state["loading"] = False
-                    st.experimental_rerun()
-                    
-                progress_bar.progress(40)
-                status_text.text("Step 2/3: Cleaning and processing text...")
-                
-                # Step 2: Clean the content
-                cleaned_data = clean_text(content)
-                
-                if debug_mode:
-                    st.markdown(f"""
-                    <div class="info-container">
-                        <h4>Debug Info: Content Length</h4>
-                        <p>Raw content length: {len(content)} characters</p>
-                        <p>Cleaned content length: {len(cleaned_data)} characters</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                progress_bar.progress(60)
-                status_text.text("Step 3/3: Extracting job information...")
-                
-                # Step 3: Load portfolio and extract jobs
-                portfolio.load_portfolio()
-                jobs = llm.extract_jobs(cleaned_data)
-                
-                # Update session state
+            # The work runs on the shared worker pool, so widget interaction never restarts it
+            st.session_state["scrape_task"] = task_queue.submit(
+                "scrape", {"url": url_input, "incremental": incremental, "render": render_mode}
+            )
+
+    polling = False
+    if st.session_state.get("scrape_task"):
+        task = task_queue.status(st.session_state["scrape_task"])
+        if task is None or task["status"] in ("done", "failed"):
+            st.session_state["scrape_task"] = None
+            st.session_state["loading"] = False
+            if task is None:
+                st.session_state["error"] = "The scrape task was lost. Please try again."
+            elif task["status"] == "failed":
+                st.session_state["error"] = scrape_error_message(task, debug_mode)
+            else:
+                result = task["result"]
+                jobs = [Job.from_dict(job) for job in result["jobs"]]
                 st.session_state["jobs"] = jobs
                 st.session_state["submitted"] = True if jobs else False
-                
+                st.session_state["incremental_report"] = result["incremental_report"]
+                st.session_state["chunk_stats"] = result["chunk_stats"]
+                st.session_state["content_lengths"] = (result["content_length"], result["cleaned_length"])
                 if not jobs:
                     st.session_state["error"] = "No jobs found in the provided URL. The page might not contain job listings or the format might not be recognized."
-                
-                progress_bar.progress(100)
-                status_text.text("Processing complete!")
-                
-            except Exception as e:
-                # Capture and show the full stack trace in debug mode
-                if debug_mode:
-                    st.session_state["error"] = f"Error details: {str(e)}\n\nStack trace: {traceback.format_exc()}"
-                else:
-                    if "Context too big" in str(e):
-                        st.session_state["error"] = "Context too big. Unable to parse jobs. The page content is too large to process at once."
-                    else:
-                        st.session_state["error"] = f"An error occurred: {str(e)}"
-                
-            finally:
-                st.session_state["loading"] = False
-                # Remove progress elements after completion
-                progress_bar.empty()
-                status_text.empty()
-                st.experimental_rerun()
+            st.experimental_rerun()
+        else:
+            st.progress(task["progress"])
+            st.text(task["message"] or "Waiting for a free worker...")
+            polling = True
 
     # Display Jobs Section
     if st.session_state["submitted"]:
@@ -418,6 +493,13 @@ def create_streamlit_app(llm, portfolio, clean_text):
             st.info("No jobs were found on the provided URL. Try a different job posting page.")
         else:
             st.success(f"Found {len(jobs)} job postings")
+            report = st.session_state.get("incremental_report")
+            if report:
+                st.info(f"Re-used {report['reused']} of {report['chunks']} page sections; "
+                        f"sent ~{report['sent_tokens']} of ~{report['page_tokens']} tokens to the LLM.")
+                if report["removed"]:
+                    removed_roles = ", ".join(job.get("role") or "Untitled role" for job in report["removed"])
+                    st.warning(f"No longer listed since the last scrape: {removed_roles}")
             
             selected_jobs = []
             cols = st.columns(min(3, len(jobs)))
@@ -431,30 +513,70 @@ def create_streamlit_app(llm, portfolio, clean_text):
             if selected_jobs:
                 st.markdown('<div class="sub-header">✉️ Generated Emails</div>', unsafe_allow_html=True)
                 
-                for job_idx, job in enumerate(selected_jobs):
-                    st.markdown(f"### 📝 Emails for: {job.get('role', 'Job Position')}")
-                    
-                    skills = job.get('skills', [])
-                    links = portfolio.query_links(skills)
-                    
-                    with st.spinner(f"Generating email variants..."):
-                        for i in range(variant_count):
+                mail_settings = dict(
+                    tone=email_tone,
+                    user_name=user_name,
+                    company_name=company_name,
+                    summary=company_summary,
+                    benefits=company_benefits
+                )
+                if stream_enabled:
+                    # Streaming renders live in this rerun, so it stays in the script thread
+                    job_links = portfolio.query_links_batch([job.get('skills', []) for job in selected_jobs])
+                    for job_idx, job in enumerate(selected_jobs):
+                        st.markdown(f"### 📝 Emails for: {job.get('role', 'Job Position')}")
+                        for variant_id in range(1, variant_count + 1):
+                            timing = {}
                             try:
-                                email = llm.write_mail(
-                                    job, links, 
-                                    tone=email_tone, 
-                                    variant_id=i+1,
-                                    user_name=user_name, 
-                                    company_name=company_name,
-                                    summary=company_summary, 
-                                    benefits=company_benefits
-                                )
-                                display_email_variant(email, job, i+1, email_tone, export_enabled)
+                                email = llm.stream_mail(job, job_links[job_idx], variant_id=variant_id,
+                                                        stats=timing, **mail_settings)
+                                display_email_variant(email, job, variant_id, email_tone, export_enabled,
+                                                      timing=timing)
                             except Exception as e:
-                                st.error(f"Failed to generate email variant {i+1}: {str(e)}")
-                    
-                    if job_idx < len(selected_jobs) - 1:
-                        st.markdown("---")
+                                st.error(f"Failed to generate email variant {variant_id}: {str(e)}")
+                        if job_idx < len(selected_jobs) - 1:
+                            st.markdown("---")
+                else:
+                    # Resubmit only when the selection or settings change; reruns keep polling the same task
+                    payload = {"jobs": [job.to_dict() for job in selected_jobs], "variant_count": variant_count,
+                               "settings": mail_settings}
+                    if st.session_state.get("generate_payload") != payload:
+                        st.session_state["generate_payload"] = payload
+                        st.session_state["generate_task"] = task_queue.submit("generate", payload)
+                    task = task_queue.status(st.session_state["generate_task"]) or {
+                        "status": "failed", "error": "The email task was lost. Please try again.", "result": None
+                    }
+                    result = task["result"] or {}
+                    emails = result.get("emails") or [[None] * variant_count for _ in selected_jobs]
+                    errors = result.get("errors") or [[None] * variant_count for _ in selected_jobs]
+
+                    if task["status"] in ("queued", "running"):
+                        st.progress(task.get("progress") or 0.0)
+                        st.text(task.get("message") or "Waiting for a free worker...")
+                        polling = True
+                    elif task["status"] == "failed":
+                        st.error(f"Failed to generate emails: {task['error']}")
+                        # Forget the payload so the same selection and settings are submitted again
+                        if st.button("🔄 Retry", key="retry_generate"):
+                            st.session_state["generate_payload"] = None
+                            st.experimental_rerun()
+
+                    for job_idx, job in enumerate(selected_jobs):
+                        st.markdown(f"### 📝 Emails for: {job.get('role', 'Job Position')}")
+                        for variant_id in range(1, variant_count + 1):
+                            email = emails[job_idx][variant_id-1]
+                            error = errors[job_idx][variant_id-1]
+                            if error:
+                                st.error(f"Failed to generate email variant {variant_id}: {error}")
+                            elif email is not None:
+                                display_email_variant(email, job, variant_id, email_tone, export_enabled)
+                            elif polling:
+                                st.caption(f"⏳ Writing email variant {variant_id}...")
+                        if job_idx < len(selected_jobs) - 1:
+                            st.markdown("---")
+                
+                if export_enabled:
+                    get_email_history().flush()
             else:
                 st.warning("Select at least one job to generate emails.")
 
@@ -473,7 +595,41 @@ def create_streamlit_app(llm, portfolio, clean_text):
         - Some websites with complex JavaScript may not be fully parsed - in that case, try copying the job text directly
         """)
 
+    if debug_mode and st.session_state.get("content_lengths"):
+        content_length, cleaned_length = st.session_state["content_lengths"]
+        st.markdown(f"""
+        <div class="info-container">
+            <h4>Debug Info: Content Length</h4>
+            <p>Raw content length: {content_length} characters</p>
+            <p>Cleaned content length: {cleaned_length} characters</p>
+        </div>
+        """, unsafe_allow_html=True)
+    if debug_mode and st.session_state.get("chunk_stats"):
+        stats = st.session_state["chunk_stats"]
+        st.markdown(f"""
+        <div class="info-container">
+            <h4>Debug Info: Chunking</h4>
+            <p>{stats['chunks']} chunks, ~{stats['page_tokens']} page tokens, ~{stats['sent_tokens']} tokens sent</p>
+            <p>Overlap ratio: {stats['overlap_ratio']:.1%}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    if debug_mode and timings:
+        display_timings(timings)
+
+    # Poll background tasks by rerunning; the work itself continues regardless of reruns
+    if polling:
+        time.sleep(TASK_POLL_INTERVAL)
+        st.experimental_rerun()
+
 if __name__ == "__main__":
-    chain = Chain()
-    portfolio = Portfolio()
-    create_streamlit_app(chain, portfolio, clean_text)
+    rerun_started = time.perf_counter()
+    chain, chain_init = get_chain()
+    portfolio, portfolio_init = get_portfolio()
+    timings = {
+        "rerun_started": rerun_started,
+        "chain_init": chain_init,
+        "portfolio_init": portfolio_init,
+        "resources": time.perf_counter() - rerun_started
+    }
+    create_streamlit_app(chain, portfolio, clean_text, timings=timings)
+
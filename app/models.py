@@ -0,0 +1,93 @@
+import re
+
+_SKILL_SEPARATORS_RE = re.compile(r"[,;\n|•]+")
+
+
+def _text(value):
+    """A single-line string for a field value; None becomes ''."""
+    if value is None:
+        return ""
+    return " ".join(str(value).split())
+
+
+def normalize_skills(value):
+    """Skills as a list of distinct non-empty strings, from a list or a comma/semicolon separated string."""
+    if value is None:
+        return []
+    items = value if isinstance(value, (list, tuple, set)) else _SKILL_SEPARATORS_RE.split(str(value))
+    skills = []
+    seen = set()
+    for item in items:
+        skill = _text(item)
+        if skill and skill.lower() not in seen:
+            seen.add(skill.lower())
+            skills.append(skill)
+    return skills
+
+
+class Job:
+    """
+    A job posting extracted from a careers page.
+    Fields are normalized on construction (whitespace collapsed, skills as a de-duplicated list),
+    and instances are treated as immutable: use replace() to change a field. get() mirrors
+    dict.get so code written against job dicts keeps working.
+    """
+
+    __slots__ = ("role", "experience", "skills", "description")
+    FIELDS = __slots__
+
+    def __init__(self, role="", experience="", skills=None, description=""):
+        self.role = _text(role)
+        self.experience = _text(experience)
+        self.skills = normalize_skills(skills)
+        self.description = _text(description)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Job from an extraction result; unknown keys are ignored."""
+        if isinstance(data, cls):
+            return data
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a job object, got {type(data).__name__}")
+        return cls(*(data.get(field) for field in cls.FIELDS))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def replace(self, **changes):
+        values = self.to_dict()
+        values.update(changes)
+        return Job(**values)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return value if value not in (None, "") else default
+
+    def is_empty(self):
+        return not (self.role or self.description or self.skills)
+
+    def to_prompt(self):
+        """Compact, canonical text of the job for LLM prompts; empty fields are left out."""
+        lines = []
+        if self.role:
+            lines.append(f"Role: {self.role}")
+        if self.experience:
+            lines.append(f"Experience: {self.experience}")
+        if self.skills:
+            lines.append(f"Skills: {', '.join(self.skills)}")
+        if self.description:
+            lines.append(f"Description: {self.description}")
+        return "\n".join(lines)
+
+    def _key(self):
+        return (self.role.lower(), self.experience.lower(), tuple(s.lower() for s in self.skills),
+                self.description.lower())
+
+    def __eq__(self, other):
+        return isinstance(other, Job) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Job(role={self.role!r}, experience={self.experience!r}, skills={self.skills!r})"
@@ -1,21 +1,131 @@
 import pandas as pd
 import chromadb
-import uuid
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from embeddings import DEFAULT_EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, embedding_model_name, get_embedding_function
+from tracing import span
+
+
+def collection_name(model):
+    """
+    Chroma collection for vectors of one embedding model, so switching models builds a fresh
+    collection instead of mixing vectors. The default model keeps the original "portfolio" name.
+    """
+    if model == DEFAULT_EMBEDDING_MODEL:
+        return "portfolio"
+    slug = re.sub(r"[^a-zA-Z0-9_-]+", "-", model).strip("-_")[:40]
+    return f"portfolio-{slug}-{hashlib.sha1(model.encode('utf-8')).hexdigest()[:8]}"
 
 
 class Portfolio:
-    def __init__(self, file_path="app/resource/my_portfolio.csv"):
+    def __init__(self, file_path="app/resources/my_portfolio.csv", batch_size=256, link_cache_size=1024,
+                 persist_directory="vectorstore", embedding_function=None,
+                 embedding_cache_path=EMBEDDING_CACHE_PATH):
         self.file_path = file_path
+        self.batch_size = batch_size  # Rows per add/upsert call, each embedded in one batch
         self.data = pd.read_csv(file_path)
-        self.chroma_client = chromadb.PersistentClient('vectorstore')
-        self.collection = self.chroma_client.get_or_create_collection(name="portfolio")
+        self._synced_mtime = None
+        self.link_cache_size = link_cache_size  # Skills whose query results are kept in memory
+        self._link_cache = OrderedDict()
+        self._link_cache_lock = threading.Lock()
+        self.chroma_client = chromadb.PersistentClient(persist_directory)
+        # Ingestion and queries share one local embedding function behind the persistent embedding cache
+        self.embedding_function = embedding_function or get_embedding_function(cache_path=embedding_cache_path)
+        self.collection = self.chroma_client.get_or_create_collection(
+            name=collection_name(embedding_model_name(self.embedding_function)),
+            embedding_function=self.embedding_function
+        )
 
     def load_portfolio(self):
-        if not self.collection.count():
-            for _, row in self.data.iterrows():
-                self.collection.add(documents=row["Techstack"],
-                                    metadatas={"links": row["Links"]},
-                                    ids=[str(uuid.uuid4())])
+        """
+        Sync the vector store with the portfolio CSV.
+        New rows are added, edited rows upserted and removed rows deleted;
+        unchanged rows are not re-embedded. Does nothing if the CSV has not changed since the last sync.
+        """
+        mtime = os.path.getmtime(self.file_path)
+        if mtime == self._synced_mtime:
+            return
+        if self._synced_mtime is not None:
+            self.data = pd.read_csv(self.file_path)
+
+        with span("portfolio_sync") as attrs:
+            self._sync(attrs)
+        self._synced_mtime = mtime
+
+    def _sync(self, attrs):
+        rows = self._portfolio_rows()
+        existing = self.collection.get(include=["metadatas"])
+        existing_hashes = {
+            id_: (metadata or {}).get("content_hash")
+            for id_, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+
+        changed = [row for row in rows if existing_hashes.get(row[0]) != row[2]["content_hash"]]
+        removed = list(set(existing_hashes) - {row[0] for row in rows})
+
+        for start in range(0, len(changed), self.batch_size):
+            batch = changed[start:start + self.batch_size]
+            self.collection.upsert(ids=[row[0] for row in batch],
+                                   documents=[row[1] for row in batch],
+                                   metadatas=[row[2] for row in batch])
+        for start in range(0, len(removed), self.batch_size):
+            self.collection.delete(ids=removed[start:start + self.batch_size])
+
+        if changed or removed:
+            with self._link_cache_lock:
+                self._link_cache.clear()
+        attrs.update(rows=len(rows), upserted=len(changed), deleted=len(removed))
+
+    def _portfolio_rows(self):
+        """Return (id, document, metadata) for each CSV row with deterministic ids."""
+        rows = []
+        seen = {}
+        for techstack, links in zip(self.data["Techstack"].astype(str), self.data["Links"].astype(str)):
+            # A row is identified by its link; repeated links get an occurrence suffix
+            base_id = hashlib.sha1(links.encode("utf-8")).hexdigest()
+            occurrence = seen.get(base_id, 0)
+            seen[base_id] = occurrence + 1
+            row_id = base_id if not occurrence else f"{base_id}-{occurrence}"
+            content_hash = hashlib.sha1(f"{techstack}\x1f{links}".encode("utf-8")).hexdigest()
+            rows.append((row_id, techstack, {"links": links, "content_hash": content_hash}))
+        return rows
 
     def query_links(self, skills):
-        return self.collection.query(query_texts=skills, n_results=2).get('metadatas', [])
+        return self.query_links_batch([skills])[0]
+
+    def query_links_batch(self, skills_per_job):
+        """
+        Look up portfolio links for many jobs at once.
+        Each unique skill is embedded and queried only once, in a single Chroma query,
+        and results are kept in an LRU cache. Returns one list of link metadatas per job,
+        in the same shape as query_links.
+        """
+        skills_per_job = [[skills] if isinstance(skills, str) else list(skills or []) for skills in skills_per_job]
+
+        # Take cached results now: another thread may clear or evict them before this call finishes
+        results = {}
+        with self._link_cache_lock:
+            for skills in skills_per_job:
+                for skill in skills:
+                    if skill in self._link_cache:
+                        self._link_cache.move_to_end(skill)
+                        results[skill] = self._link_cache[skill]
+        missing = list(dict.fromkeys(skill for skills in skills_per_job for skill in skills if skill not in results))
+
+        if missing:
+            with span("vector_query", skills=len(missing)):
+                metadatas = self.collection.query(query_texts=missing, n_results=2).get('metadatas', [])
+            # content_hash is only for change detection on load; callers get the links alone
+            fetched = {skill: [{"links": m["links"]} for m in matches] for skill, matches in zip(missing, metadatas)}
+            results.update(fetched)
+
+            with self._link_cache_lock:
+                self._link_cache.update(fetched)
+                while len(self._link_cache) > self.link_cache_size:
+                    self._link_cache.popitem(last=False)
+
+        return [[results[skill] for skill in skills] for skills in skills_per_job]
@@ -0,0 +1,196 @@
+"""
+Client-side scheduling for rate-limited LLM providers.
+
+Every call reserves one request and an estimate of its tokens from per-minute token
+buckets before it is sent, and gives back whatever it did not use once the real usage
+is known. Interactive callers (emails) are served before background ones (extraction)
+whenever both are waiting. A 429 pauses all callers until the provider's Retry-After
+and halves the rate the buckets refill at; successful calls raise it back gradually.
+Other transient failures (408, 409, 5xx, dropped connections) are retried with backoff
+by the failing caller alone, since the provider clients run with their own retries off.
+"""
+import re
+import threading
+import time
+
+from tracing import tracer
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_RETRY_IN_RE = re.compile(r"try again in (?:(\d+)m)?(\d+(?:\.\d+)?)(ms|s)", re.IGNORECASE)
+
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 / rate-limit errors from any provider client."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "ratelimit" in type(error).__name__.lower() or any(
+        marker in message for marker in ("429", "rate limit", "rate_limit"))
+
+
+def is_transient_error(error):
+    """
+    True for errors worth retrying that are not rate limits: HTTP 408, 409 and 5xx, and failed
+    connections. Timeouts are left to the caller, which knows its own deadline.
+    """
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409) or status >= 500
+    name = type(error).__name__.lower()
+    return "connect" in name and "timeout" not in name
+
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, from a Retry-After header or the error message; None if unknown."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    match = _RETRY_IN_RE.search(str(error))
+    if not match:
+        return None
+    minutes, value, unit = match.groups()
+    return int(minutes or 0) * 60 + float(value) / (1000 if unit == "ms" else 1)
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously; the level may go negative to record overuse."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now, factor=1.0):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60 * factor)
+        self.updated = now
+
+    def wait_time(self, amount, factor=1.0):
+        """Seconds until amount is available at the current refill rate."""
+        missing = amount - self.level
+        return 0.0 if missing <= 0 else missing / (self.capacity / 60 * factor)
+
+
+class RateLimitScheduler:
+    """Shared request/token budget for one provider; a limit of 0 (or None) disables that bucket."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_retries=5, retry_backoff=1.0,
+                 min_factor=0.25):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries  # Retried attempts per call before the error is raised
+        self.retry_backoff = retry_backoff  # Base wait in seconds when an error carries no Retry-After
+        self.min_factor = min_factor  # Lowest fraction of the configured rate adaptation may drop to
+        self.factor = 1.0  # Current fraction of the configured rate
+        self._blocked_until = 0.0
+        self._waiting = [0, 0]  # Callers waiting per priority
+        self._cond = threading.Condition()
+        self.stats = {"calls": 0, "rate_limited": 0, "transient_errors": 0, "throttled_seconds": 0.0}
+
+    def acquire(self, tokens, priority=BACKGROUND):
+        """Block until the call fits the budget and no higher-priority caller is waiting; return the tokens reserved."""
+        if self.tokens is not None:
+            tokens = min(tokens, self.tokens.capacity)  # A call larger than the bucket could never be sent
+        started = time.monotonic()
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._blocked_until - now
+                    for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                        if bucket is not None:
+                            bucket.refill(now, self.factor)
+                            wait = max(wait, bucket.wait_time(amount, self.factor))
+                    if wait <= 0 and not any(self._waiting[:priority]):
+                        if self.requests is not None:
+                            self.requests.level -= 1
+                        if self.tokens is not None:
+                            self.tokens.level -= tokens
+                        break
+                    # Higher-priority callers notify when they leave; the timeout covers refills
+                    self._cond.wait(timeout=max(wait, 0.05))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+        waited = time.monotonic() - started
+        self.stats["calls"] += 1
+        if waited > 0.01:
+            self.stats["throttled_seconds"] += waited
+            tracer.add("ratelimit.wait", waited * 1000, priority=priority, tokens=tokens)
+        return tokens
+
+    def settle(self, reserved, used):
+        """Return unused reserved tokens to the budget (or charge the overrun) once real usage is known."""
+        if self.tokens is not None and used is not None:
+            with self._cond:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+                self._cond.notify_all()
+
+    def backoff(self, error, attempt):
+        """Pause every caller after a 429 and lower the refill rate."""
+        delay = retry_after(error)
+        if delay is None:
+            delay = self.retry_backoff * 2 ** attempt
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self.factor = max(self.min_factor, self.factor / 2)
+            self._cond.notify_all()
+        self.stats["rate_limited"] += 1
+        tracer.add("ratelimit.429", delay * 1000, attempt=attempt, factor=self.factor)
+
+    def retry(self, error, attempt):
+        """Wait out a retryable error before the next attempt; False if error should be raised instead."""
+        if is_rate_limit_error(error):
+            self.backoff(error, attempt)
+        elif is_transient_error(error):
+            delay = retry_after(error)
+            if delay is None:
+                delay = self.retry_backoff * 2 ** attempt
+            self.stats["transient_errors"] += 1
+            tracer.add("llm.retry", delay * 1000, attempt=attempt, status=getattr(error, "status_code", None))
+            time.sleep(delay)
+        else:
+            return False
+        return True
+
+    def _succeeded(self):
+        if self.factor < 1.0:
+            with self._cond:
+                self.factor = min(1.0, self.factor + 0.05)
+
+    def call(self, fn, tokens, priority=BACKGROUND, usage=None):
+        """Run fn() within the budget, retrying rate limits and transient errors; usage(result) gives the real tokens."""
+        for attempt in range(self.max_retries + 1):
+            reserved = self.acquire(tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                self.settle(reserved, 0)  # Rejected and failed calls don't consume tokens
+                if attempt == self.max_retries or not self.retry(e, attempt):
+                    raise
+                continue
+            self._succeeded()
+            self.settle(reserved, usage(result) if usage else None)
+            return result
+
+    def stream(self, make_stream, tokens, priority=INTERACTIVE):
+        """Yield from make_stream() within the budget, retrying a failed attempt before its first piece."""
+        for attempt in range(self.max_retries + 1):
+            reserved = self.acquire(tokens, priority)
+            started = False
+            try:
+                for piece in make_stream():
+                    started = True
+                    yield piece
+            except Exception as e:
+                self.settle(reserved, 0)
+                if started or attempt == self.max_retries or not self.retry(e, attempt):
+                    raise
+                continue
+            self._succeeded()
+            return
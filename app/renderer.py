@@ -0,0 +1,179 @@
+"""
+Optional JavaScript rendering of careers pages with a pool of headless Chrome instances.
+
+Single-page-app careers sites return an almost empty shell to a plain HTTP fetch. For those
+pages fetch_text_safely renders the URL in a warm headless browser instead. Drivers are kept
+alive between pages and a driver that last rendered a domain is preferred for that domain
+again, so its cookies, HTTP cache and connections are reused. Images, fonts and media are
+blocked. Rendered HTML goes into the page cache for RENDER_CACHE_TTL seconds.
+
+Needs selenium and a local Chrome/Chromium. SMARTREACH_RENDER picks the mode (auto, always,
+never) and SMARTREACH_BROWSER_POOL_SIZE the number of browsers. Only http(s) URLs are
+rendered, so a URL from the UI or a batch file can never make the browser read local files.
+"""
+import atexit
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from fetcher import MIN_CONTENT_LENGTH, get_page_cache
+from tracing import span
+
+try:
+    from selenium import webdriver
+    from selenium.common.exceptions import WebDriverException
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+RENDER_SCHEMES = ("http", "https")
+RENDER_CACHE_TTL = 3600  # Seconds a rendered page is reused; rendered pages have no HTTP validators
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3"
+]
+TEXT_LENGTH_JS = "return document.body ? document.body.innerText.length : 0;"
+
+
+class RenderUnavailable(Exception):
+    """Rendering is not possible here: selenium or a browser is missing."""
+
+
+class BrowserPool:
+    """Warm pool of headless Chrome drivers, each used by one render at a time."""
+
+    def __init__(self, size=2, page_load_timeout=20, settle_timeout=5.0, poll_interval=0.25):
+        self.size = size  # Maximum number of browsers
+        self.page_load_timeout = page_load_timeout  # Seconds before driver.get gives up
+        self.settle_timeout = settle_timeout  # Seconds to wait for script-inserted content after load
+        self.poll_interval = poll_interval
+        self.unavailable = None if SELENIUM_AVAILABLE else "selenium is not installed"
+        self._idle = []  # (driver, last domain)
+        self._count = 0
+        self._cond = threading.Condition()
+        atexit.register(self.close)
+
+    def _new_driver(self):
+        options = webdriver.ChromeOptions()
+        for argument in ("--headless=new", "--disable-gpu", "--no-sandbox", "--disable-dev-shm-usage",
+                         "--disable-extensions", "--blink-settings=imagesEnabled=false"):
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return driver
+
+    def _acquire(self, domain):
+        with self._cond:
+            while True:
+                if self.unavailable:
+                    raise RenderUnavailable(self.unavailable)
+                if self._idle:
+                    # Prefer the driver that last rendered this domain, else the least recently used one
+                    index = next((i for i, (_, last) in enumerate(self._idle) if last == domain), 0)
+                    return self._idle.pop(index)[0]
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                self._cond.wait()
+
+        try:
+            return self._new_driver()
+        except Exception as e:
+            reason = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+            with self._cond:
+                self._count -= 1
+                # A browser that fails to start won't start next time either; stop trying
+                self.unavailable = f"Could not start headless Chrome: {reason}"
+                self._cond.notify_all()
+            raise RenderUnavailable(self.unavailable)
+
+    def _release(self, driver, domain, broken=False):
+        with self._cond:
+            if broken:
+                self._count -= 1
+            else:
+                self._idle.append((driver, domain))
+            self._cond.notify()
+        if broken:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def render(self, url):
+        """Load url and return the page source once its visible text has stopped changing."""
+        parsed = urlparse(url)
+        if parsed.scheme not in RENDER_SCHEMES:
+            raise ValueError(f"Only {' and '.join(RENDER_SCHEMES)} URLs can be rendered, got '{parsed.scheme}'")
+        domain = parsed.netloc
+        driver = self._acquire(domain)
+        broken = False
+        try:
+            driver.get(url)
+            self._wait_for_content(driver)
+            return driver.page_source
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self._release(driver, domain, broken)
+
+    def _wait_for_content(self, driver):
+        """
+        Completeness heuristic: wait until the body text has been the same length for two polls,
+        and is long enough to hold postings (or has stayed unchanged for three polls), up to settle_timeout.
+        """
+        deadline = time.monotonic() + self.settle_timeout
+        previous, stable = -1, 0
+        while time.monotonic() < deadline:
+            length = driver.execute_script(TEXT_LENGTH_JS)
+            stable = stable + 1 if length == previous else 0
+            if stable >= 2 and (length >= MIN_CONTENT_LENGTH or stable >= 3):
+                return
+            previous = length
+            time.sleep(self.poll_interval)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+        for driver, _ in idle:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Return the shared browser pool; browsers start lazily on the first render."""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool(size=int(os.getenv("SMARTREACH_BROWSER_POOL_SIZE", "2")))
+        return _browser_pool
+
+
+def render_html(url, use_cache=True, cache_ttl=RENDER_CACHE_TTL):
+    """Return the rendered HTML of url as bytes, from the page cache while it is fresh."""
+    cache = get_page_cache() if use_cache else None
+    cache_key = "rendered:" + url
+    if cache:
+        body, metadata = cache.load(cache_key)
+        if body is not None and time.time() - metadata.get("fetched_at", 0) < cache_ttl:
+            return body
+
+    with span("render", url=url) as attrs:
+        html = get_browser_pool().render(url).encode("utf-8")
+        attrs["bytes"] = len(html)
+    if cache:
+        cache.store(cache_key, html, {})
+    return html
@@ -0,0 +1,79 @@
+import json
+import sqlite3
+import threading
+import time
+
+from utils import select_in
+
+
+class SnapshotStore:
+    """
+    Per-URL snapshots of a careers page for incremental re-scraping.
+    Extracted jobs are stored per chunk hash (shared across URLs), and each URL keeps
+    the chunk hashes and jobs of its last scrape so the next one can be diffed against it.
+    Chunk results and snapshots older than keep_seconds are dropped when the store opens,
+    so chunks are re-extracted now and then and unused entries don't pile up.
+    """
+
+    def __init__(self, path="snapshots.sqlite", keep_seconds=30 * 24 * 3600):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunk_jobs (
+                chunk_hash TEXT PRIMARY KEY,
+                jobs TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                url TEXT PRIMARY KEY,
+                chunk_hashes TEXT NOT NULL,
+                jobs TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._prune(keep_seconds)
+
+    def _prune(self, keep_seconds):
+        """Drop chunk results and snapshots older than keep_seconds."""
+        cutoff = time.time() - keep_seconds
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_jobs WHERE created_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM snapshots WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+
+    def chunk_jobs(self, chunk_hashes):
+        """Return {chunk_hash: jobs} for the hashes that have been extracted before."""
+        with self._lock:
+            rows = select_in(self._conn, "SELECT chunk_hash, jobs FROM chunk_jobs WHERE chunk_hash IN ({placeholders})",
+                             set(chunk_hashes))
+        return {chunk_hash: json.loads(jobs) for chunk_hash, jobs in rows}
+
+    def save_chunk_jobs(self, chunk_jobs):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_jobs (chunk_hash, jobs, created_at) VALUES (?, ?, ?)",
+                [(chunk_hash, json.dumps(jobs), now) for chunk_hash, jobs in chunk_jobs.items()]
+            )
+            self._conn.commit()
+
+    def load_snapshot(self, url):
+        """Return (chunk_hashes, jobs) from the last scrape of url, or ([], []) if there is none."""
+        with self._lock:
+            row = self._conn.execute("SELECT chunk_hashes, jobs FROM snapshots WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return [], []
+        return json.loads(row[0]), json.loads(row[1])
+
+    def save_snapshot(self, url, chunk_hashes, jobs):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (url, chunk_hashes, jobs, updated_at) VALUES (?, ?, ?, ?)",
+                (url, json.dumps(chunk_hashes), json.dumps(jobs), time.time())
+            )
+            self._conn.commit()
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+
+
+class TaskQueue:
+    """
+    In-process background worker pool with task state persisted in SQLite.
+    Handlers run on a bounded thread pool shared by every session, so a long scrape keeps
+    going while the UI reruns; callers submit a task and poll its status by id.
+    Tasks still queued when the process stopped are resubmitted on start-up, and tasks
+    that were running are marked failed.
+    """
+
+    def __init__(self, path="tasks.sqlite", max_workers=4, handlers=None, keep_seconds=24 * 3600):
+        self.path = path
+        self.handlers = dict(handlers or {})  # kind -> handler(payload, report) returning a JSON-able result
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                traceback TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status)")
+        self._conn.commit()
+        self._recover(keep_seconds)
+
+    def submit(self, kind, payload):
+        """Queue a task and return its id."""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler for task kind '{kind}'")
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tasks (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (task_id, kind, json.dumps(payload), now, now)
+            )
+            self._conn.commit()
+        self._executor.submit(self._run, task_id, kind, payload)
+        return task_id
+
+    def status(self, task_id):
+        """Return the task as a dict (status is queued, running, done or failed), or None if unknown."""
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT id, kind, status, progress, message, result, error, traceback, created_at, updated_at
+                FROM tasks WHERE id = ?
+            """, (task_id,)).fetchone()
+        if row is None:
+            return None
+        task = dict(zip(("id", "kind", "status", "progress", "message", "result", "error", "traceback",
+                         "created_at", "updated_at"), row))
+        task["result"] = json.loads(task["result"]) if task["result"] else None
+        return task
+
+    def counts(self):
+        """Number of tasks per status."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+    def _run(self, task_id, kind, payload):
+        self._update(task_id, status="running")
+
+        def report(progress, message=None, partial=None):
+            # Handlers call this to publish progress and, optionally, results so far
+            self._update(task_id, progress=progress, message=message,
+                         **({"result": partial} if partial is not None else {}))
+
+        try:
+            with span(f"task.{kind}"):
+                result = self.handlers[kind](payload, report)
+            self._update(task_id, status="done", progress=1.0, result=result)
+        except Exception as e:
+            print(f"Task {kind} {task_id} failed: {str(e)}")
+            self._update(task_id, status="failed", error=str(e), traceback=traceback.format_exc())
+
+    def _update(self, task_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE tasks SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                list(fields.values()) + [task_id]
+            )
+            self._conn.commit()
+
+    def _recover(self, keep_seconds):
+        """Drop old finished tasks, fail interrupted ones and resubmit ones that never started."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE status IN ('done', 'failed') AND updated_at < ?",
+                               (now - keep_seconds,))
+            self._conn.execute("""
+                UPDATE tasks SET status = 'failed', error = 'Interrupted by a server restart', updated_at = ?
+                WHERE status = 'running'
+            """, (now,))
+            queued = self._conn.execute("SELECT id, kind, payload FROM tasks WHERE status = 'queued'").fetchall()
+            self._conn.commit()
+        for task_id, kind, payload in queued:
+            if kind in self.handlers:
+                self._executor.submit(self._run, task_id, kind, json.loads(payload))
+            else:
+                self._update(task_id, status="failed", error=f"No handler for task kind '{kind}'")
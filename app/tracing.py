@@ -0,0 +1,104 @@
+"""
+Lightweight per-stage tracing for the pipeline.
+
+Wrap a stage in `with span("fetch", url=url) as attrs:`; the span's duration, attributes
+(callers may add more to attrs) and any error are kept in memory for the app's Performance
+panel, appended to SMARTREACH_TRACE_FILE as JSONL when that is set, and can be exported as
+Prometheus text with tracer.export_prometheus().
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Tracer:
+    def __init__(self, max_spans=10000, jsonl_path=None):
+        self.spans = deque(maxlen=max_spans)  # Most recent spans, oldest dropped first
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block as a span called name; yields its attribute dict."""
+        record = {"name": name, "start": time.time(), "attributes": attributes}
+        started = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["duration_ms"] = (time.perf_counter() - started) * 1000
+            self._record(record)
+
+    def add(self, name, duration_ms, **attributes):
+        """Record a span measured elsewhere, e.g. across the yields of a generator."""
+        self._record({"name": name, "start": time.time() - duration_ms / 1000,
+                      "attributes": attributes, "duration_ms": duration_ms})
+
+    def _record(self, record):
+        with self._lock:
+            self.spans.append(record)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+
+    def stage_stats(self):
+        """Summarise recorded spans per stage: count, errors, p50/p95 and total latency."""
+        with self._lock:
+            spans = list(self.spans)
+        by_stage = {}
+        for record in spans:
+            by_stage.setdefault(record["name"], []).append(record)
+
+        stats = []
+        for name, records in by_stage.items():
+            durations = sorted(r["duration_ms"] for r in records)
+            stats.append({
+                "stage": name,
+                "count": len(records),
+                "errors": sum(1 for r in records if "error" in r or "error" in r["attributes"]),
+                "p50_ms": statistics.median(durations),
+                "p95_ms": durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+                "total_ms": sum(durations)
+            })
+        return sorted(stats, key=lambda s: s["total_ms"], reverse=True)
+
+    def export_prometheus(self, path=None):
+        """Render per-stage latency as Prometheus text format, writing it to path if given."""
+        lines = [
+            "# HELP smartreach_stage_duration_seconds Pipeline stage latency.",
+            "# TYPE smartreach_stage_duration_seconds summary"
+        ]
+        error_lines = [
+            "# HELP smartreach_stage_errors_total Pipeline stage failures.",
+            "# TYPE smartreach_stage_errors_total counter"
+        ]
+        for s in self.stage_stats():
+            label = f'stage="{s["stage"]}"'
+            lines.append(f'smartreach_stage_duration_seconds{{{label},quantile="0.5"}} {s["p50_ms"] / 1000:.6f}')
+            lines.append(f'smartreach_stage_duration_seconds{{{label},quantile="0.95"}} {s["p95_ms"] / 1000:.6f}')
+            lines.append(f'smartreach_stage_duration_seconds_sum{{{label}}} {s["total_ms"] / 1000:.6f}')
+            lines.append(f'smartreach_stage_duration_seconds_count{{{label}}} {s["count"]}')
+            error_lines.append(f'smartreach_stage_errors_total{{{label}}} {s["errors"]}')
+        text = "\n".join(lines + error_lines) + "\n"
+        if path:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+
+
+tracer = Tracer(jsonl_path=os.getenv("SMARTREACH_TRACE_FILE"))
+
+
+def span(name, **attributes):
+    """Record a span on the process-wide tracer."""
+    return tracer.span(name, **attributes)
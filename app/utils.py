@@ -1,15 +1,54 @@
 import re
 import json
+import codecs
+import string
+
+from tracing import span
+
+# clean_text works on ASCII bytes in fixed-size blocks. Non-ASCII characters become '#',
+# which (like them) is not part of a URL and is dropped with the other punctuation.
+_CLEAN_BLOCK_SIZE = 1 << 18
+_TAG_RE = re.compile(rb'<[^>]*>')
+_URL_RE = re.compile(rb'https?://[!$-_a-z]+')  # Same characters as the original URL pattern's alternation
+_SPACES_RE = re.compile(rb' {2,}')
+_KEEP_BYTES = (string.ascii_letters + string.digits + ' ').encode('ascii')
+_DROP_BYTES = bytes(c for c in range(256) if c not in _KEEP_BYTES)
+codecs.register_error('clean_text_non_ascii', lambda e: ('#', e.end))
 
 def clean_text(text):
     """Clean raw HTML and special characters from webpage content."""
-    text = re.sub(r'<[^>]*?>', '', text)  # Remove HTML tags
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)  # Remove URLs
-    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)  # Remove non-alphanum characters
-    text = re.sub(r'\s{2,}', ' ', text)  # Collapse multiple spaces
-    text = text.strip()
-    text = ' '.join(text.split())  # Remove excess whitespace
-    return text
+    with span("clean", chars=len(text)):
+        parts = []
+        for piece in _iter_clean_blocks(text, _CLEAN_BLOCK_SIZE):
+            piece = _URL_RE.sub(b'', piece)  # Remove URLs
+            piece = piece.translate(None, _DROP_BYTES)  # Remove non-alphanum characters
+            piece = _SPACES_RE.sub(b' ', piece).strip()  # Collapse multiple spaces
+            if piece:
+                parts.append(piece)
+        return b' '.join(parts).decode('ascii')
+
+def _iter_clean_blocks(text, block_size):
+    """
+    Yield the page with HTML tags removed, one block at a time.
+    Every block but the last ends on a space, so URLs and words never straddle two blocks.
+    """
+    pending = b''  # Raw bytes from an unclosed '<' onwards, waiting for its '>'
+    tail = b''  # Tag-free bytes after the last space, which may continue in the next block
+    for start in range(0, len(text), block_size):
+        raw = pending + text[start:start + block_size].encode('ascii', 'clean_text_non_ascii')
+        # Tags are removed leftmost-first, so only a '<' after the last '>' can still be open
+        cut = raw.find(b'<', raw.rfind(b'>') + 1)
+        if cut == -1:
+            pending = b''
+        else:
+            raw, pending = raw[:cut], raw[cut:]
+
+        ready = tail + _TAG_RE.sub(b'', raw)  # Remove HTML tags
+        split = ready.rfind(b' ') + 1
+        tail = ready[split:]
+        yield ready[:split]
+    # A '<' still pending here is never closed, so it is kept like any other text
+    yield tail + pending
 
 def extract_jobs_summary(job):
     """Format job summary with new lines and bullet points."""
@@ -26,4 +65,16 @@ def extract_jobs_summary(job):
         f"Skills:\n{skills_formatted}\n"
         f"Description: {description}"
     )
-    return summary
\ No newline at end of file
+    return summary
+
+def select_in(conn, query, keys, batch_size=500):
+    """
+    Run query, whose "{placeholders}" stands for the IN list, for keys in batches and return all rows.
+    Batches keep well under SQLite's bound-parameter limit.
+    """
+    keys = list(keys)
+    rows = []
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        rows.extend(conn.execute(query.format(placeholders=",".join("?" * len(batch))), batch).fetchall())
+    return rows
@@ -0,0 +1,73 @@
+"""
+Per-call overhead of Chain's extraction and email pipelines, measured with a stubbed LLM.
+
+"rebuilt" reproduces the old behaviour of building the PromptTemplate, the prompt | llm
+runnable and the JsonOutputParser on every call; "precompiled" uses the pipelines Chain
+builds once in __init__. The LLM cache is disabled so only pipeline overhead is measured.
+
+    python benchmarks/bench_chain_overhead.py [--calls 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+from langchain_core.output_parsers import JsonOutputParser  # noqa: E402
+from langchain_core.prompts import PromptTemplate  # noqa: E402
+
+from chains import Chain  # noqa: E402
+
+JOBS_RESPONSE = json.dumps([{"role": "Python Developer", "experience": "3+ years",
+                             "skills": ["Python", "Django"], "description": "Build APIs."}])
+EMAIL_RESPONSE = "Dear Hiring Manager, ..."
+PAGE_TEXT = "Careers Python Developer 3 years experience Django REST APIs " * 50
+JOB = {"role": "Python Developer", "experience": "3+ years", "skills": ["Python"], "description": "Build APIs."}
+
+
+def rebuilt_extract(chain, text):
+    prompt = PromptTemplate.from_template(chain.prompt_extract.template)
+    res = (prompt | chain.llm).invoke(input={"page_data": text})
+    return JsonOutputParser().parse(res.content)
+
+
+def rebuilt_email(chain, job, links):
+    prompt = PromptTemplate.from_template(chain.prompt_email.template)
+    inputs = chain._mail_inputs(job, links, "Professional", 1, "Mohan", "AtliQ", "", "")
+    return (prompt | chain.llm).invoke(inputs).content
+
+
+def per_call_us(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    extract_chain = Chain(use_cache=False, llm=FakeListChatModel(responses=[JOBS_RESPONSE]))
+    email_chain = Chain(use_cache=False, llm=FakeListChatModel(responses=[EMAIL_RESPONSE]))
+
+    cases = [
+        ("extract", "rebuilt", lambda: rebuilt_extract(extract_chain, PAGE_TEXT)),
+        ("extract", "precompiled", lambda: extract_chain._process_job_chunk(PAGE_TEXT)),
+        ("write_mail", "rebuilt", lambda: rebuilt_email(email_chain, JOB, [])),
+        ("write_mail", "precompiled", lambda: email_chain.write_mail(JOB, [])),
+    ]
+    for _, _, func in cases:  # Warm up imports and lazy initialisation
+        func()
+
+    print(f"{'stage':>10} {'pipeline':>12} {'us/call':>9}")
+    for stage, variant, func in cases:
+        print(f"{stage:>10} {variant:>12} {per_call_us(func, args.calls):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark for utils.clean_text on synthetic career pages of 100 KB to 10 MB.
+
+Compares the current cleaner with the original five-pass regex implementation,
+checks that both produce identical output, and reports time, throughput and peak memory.
+
+    python benchmarks/bench_clean_text.py [--sizes 100000 1000000 10000000] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from utils import clean_text  # noqa: E402
+
+FRAGMENTS = [
+    '<div class="job-card">', '</div>', '<a href="https://example.com/careers/1234?ref=board">', '</a>',
+    'Senior', 'Python', 'Engineer', 'Experience:', '5+ years', 'Skills:', 'React,', 'Node.js,', 'AWS',
+    'https://example.com/apply/software-engineer', '&amp;', 'café', '—', '\n', '\t', '  ',
+    '<script>var x = {"a": 1};</script>', '<br/>', 'We are hiring!', '(remote)', '$120k–$150k',
+]
+
+
+def legacy_clean_text(text):
+    """The original clean_text, kept as the reference for output and speed."""
+    text = re.sub(r'<[^>]*?>', '', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    text = text.strip()
+    text = ' '.join(text.split())
+    return text
+
+
+def synthetic_page(size, seed=0):
+    """Build a pseudo-random HTML careers page of roughly size characters."""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        fragment = rng.choice(FRAGMENTS)
+        parts.append(fragment)
+        length += len(fragment) + 1
+    return " ".join(parts)[:size]
+
+
+def measure(func, text, repeat):
+    """Return the best wall time over repeat runs and the peak traced memory of one run."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'size':>10} {'impl':>8} {'time (s)':>10} {'MB/s':>8} {'peak MB':>9}")
+    for size in args.sizes:
+        page = synthetic_page(size)
+        if clean_text(page) != legacy_clean_text(page):
+            sys.exit(f"clean_text output differs from the reference on a {size} character page")
+        for name, func in (("legacy", legacy_clean_text), ("current", clean_text)):
+            seconds, peak = measure(func, page, args.repeat)
+            results.append({"size": size, "impl": name, "seconds": seconds,
+                            "mb_per_s": size / seconds / 1e6, "peak_bytes": peak})
+            print(f"{size:>10} {name:>8} {seconds:>10.4f} {size / seconds / 1e6:>8.1f} {peak / 1e6:>9.1f}")
+        legacy, current = results[-2]["seconds"], results[-1]["seconds"]
+        print(f"{'':>10} speedup {legacy / current:.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cold-start portfolio ingestion and skill queries with and without the embedding cache.
+
+Each run builds the portfolio into a fresh vectorstore directory:
+
+- cold:          empty embedding cache, every row is embedded
+- rebuild:       new vectorstore, warm embedding cache (e.g. after deleting vectorstore/)
+- uncached:      new vectorstore without the cache, for reference
+
+and then queries a set of common skills on a cold and a warm cache. The model comes from
+--model (default: SMARTREACH_EMBEDDING_MODEL, else all-MiniLM-L6-v2); use --model hash offline.
+
+    python benchmarks/bench_embeddings.py [--rows 1000] [--batch-size 64] [--model hash]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")  # Keep Chroma from phoning home during runs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import write_portfolio_csv  # noqa: E402
+from embeddings import CachedEmbeddingFunction, create_embedding_function  # noqa: E402
+from llm_backends import FAKE_SKILLS  # noqa: E402
+from portfolio import Portfolio  # noqa: E402
+
+
+def ingest(csv_path, workdir, embedding_function):
+    portfolio = Portfolio(csv_path, persist_directory=tempfile.mkdtemp(dir=workdir),
+                          embedding_function=embedding_function)
+    started = time.perf_counter()
+    portfolio.load_portfolio()
+    return portfolio, time.perf_counter() - started
+
+
+def query(portfolio, skills):
+    portfolio._link_cache.clear()  # Measure embedding and vector search, not the in-memory link cache
+    started = time.perf_counter()
+    portfolio.query_links_batch([[skill] for skill in skills])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Portfolio rows to ingest")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding model call")
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+
+    model = args.model or os.getenv("SMARTREACH_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    workdir = tempfile.mkdtemp(prefix="bench_embeddings_")
+    try:
+        csv_path = os.path.join(workdir, "portfolio.csv")
+        write_portfolio_csv(csv_path, args.rows, distinct=True)
+        base = create_embedding_function(model)
+        cached = CachedEmbeddingFunction(base, model, os.path.join(workdir, "embedding_cache.sqlite"),
+                                         args.batch_size)
+
+        print(f"model {model}, {args.rows} rows, batch size {args.batch_size}")
+        print(f"{'case':>16} {'seconds':>9} {'rows/s':>10} {'embedded':>9}")
+        for case, embedding_function in (("cold", cached), ("rebuild", cached), ("uncached", base)):
+            misses = cached.misses
+            portfolio, elapsed = ingest(csv_path, workdir, embedding_function)
+            embedded = cached.misses - misses if embedding_function is cached else args.rows
+            print(f"{case:>16} {elapsed:>9.2f} {args.rows / elapsed:>10.0f} {embedded:>9}")
+
+        portfolio, _ = ingest(csv_path, workdir, cached)
+        skills = [f"{skill} {other}" for skill in FAKE_SKILLS for other in FAKE_SKILLS]
+        for case in ("query cold", "query warm"):
+            misses = cached.misses
+            elapsed = query(portfolio, skills)
+            print(f"{case:>16} {elapsed:>9.3f} {len(skills) / elapsed:>10.0f} {cached.misses - misses:>9}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
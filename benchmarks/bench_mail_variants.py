@@ -0,0 +1,72 @@
+"""
+Cost of writing N email variants per job: one write_mail call per variant versus a single
+write_mail_variants call returning all of them as JSON.
+
+Prompt tokens are estimated from the rendered prompts; latency is measured against FakeLLM
+with a fixed per-call delay standing in for the provider round trip. The LLM cache is disabled.
+
+    python benchmarks/bench_mail_variants.py [--variants 1 3 5] [--llm-latency 0.2] [--links 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from chains import Chain  # noqa: E402
+from llm_backends import FakeLLM  # noqa: E402
+
+JOB = {
+    "role": "Senior Python Developer",
+    "experience": "5+ years",
+    "skills": ["Python", "Django", "PostgreSQL", "AWS", "Docker"],
+    "description": "Design, build and operate REST APIs and data pipelines for our analytics platform. " * 4
+}
+MAIL_SETTINGS = dict(
+    tone="Professional",
+    summary="AtliQ is an AI & software consulting company that has helped many enterprises automate their processes.",
+    benefits="process optimization, cost reduction, and heightened overall efficiency"
+)
+
+
+def prompt_tokens(chain, prompt_chain, inputs):
+    return chain._estimate_tokens(prompt_chain.first.format(**inputs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per simulated LLM call")
+    parser.add_argument("--links", type=int, default=5, help="Portfolio links per job")
+    args = parser.parse_args()
+
+    chain = Chain(use_cache=False, llm=FakeLLM(latency=args.llm_latency))
+    links = [{"links": f"https://example.com/portfolio/{i}"} for i in range(args.links)]
+
+    print(f"{'variants':>8} {'mode':>12} {'calls':>6} {'prompt tok':>11} {'latency s':>10}")
+    for count in args.variants:
+        mail_inputs = [chain._mail_inputs(JOB, links, MAIL_SETTINGS["tone"], v, "Mohan", "AtliQ",
+                                          MAIL_SETTINGS["summary"], MAIL_SETTINGS["benefits"])
+                       for v in range(1, count + 1)]
+        variant_inputs = dict(mail_inputs[0], variant_count=count)
+        del variant_inputs["variant_id"]
+
+        # Per-variant calls run one after another, as a single job's variants would on one worker
+        started = time.perf_counter()
+        for v in range(1, count + 1):
+            chain.write_mail(JOB, links, variant_id=v, **MAIL_SETTINGS)
+        per_variant = time.perf_counter() - started
+        tokens = sum(prompt_tokens(chain, chain.chain_email, inputs) for inputs in mail_inputs)
+        print(f"{count:>8} {'per-variant':>12} {count:>6} {tokens:>11} {per_variant:>10.2f}")
+
+        started = time.perf_counter()
+        emails = chain.write_mail_variants(JOB, links, count, **MAIL_SETTINGS)
+        single = time.perf_counter() - started
+        assert len(emails) == count
+        tokens = prompt_tokens(chain, chain.chain_variants, variant_inputs)
+        print(f"{count:>8} {'single-call':>12} {1:>6} {tokens:>11} {single:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+End-to-end benchmark of the SmartReachAI pipeline stages on synthetic career pages.
+
+Stages: clean_text, Chain._chunk_text, Chain._process_job_chunk, Chain._deduplicate_jobs,
+Portfolio.load_portfolio (cold ingest), Portfolio.query_links and Chain.write_mail.
+The LLM is the offline FakeLLM and, unless --real-embeddings is given, the portfolio uses a
+hashing embedding function, so the suite needs no network and measures our own overhead.
+
+For every stage and page size it reports p50/p95 latency, throughput and peak traced memory.
+Results can be saved as a JSON baseline and compared against on later runs:
+
+    python benchmarks/bench_pipeline.py --save benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --compare benchmarks/baseline.json --fail-threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")  # Keep Chroma from phoning home during runs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_clean_text import synthetic_page  # noqa: E402
+from chains import Chain  # noqa: E402
+from embeddings import HashEmbeddingFunction, create_embedding_function  # noqa: E402
+from llm_backends import FAKE_SKILLS, FakeLLM  # noqa: E402
+from portfolio import Portfolio  # noqa: E402
+from utils import clean_text  # noqa: E402
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_stage(func, setup, repeat):
+    """Time func(state) over repeat runs (setup() builds fresh state each time) and trace one run's memory."""
+    timings = []
+    for _ in range(repeat):
+        state = setup()
+        started = time.perf_counter()
+        func(state)
+        timings.append(time.perf_counter() - started)
+
+    state = setup()
+    tracemalloc.start()
+    func(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "peak_kb": peak / 1024
+    }
+
+
+def write_portfolio_csv(path, rows, distinct=False):
+    """Synthetic portfolio CSV; with distinct, every techstack is unique so each row needs its own embedding."""
+    with open(path, "w") as f:
+        f.write('"Techstack","Links"\n')
+        for i in range(rows):
+            stack = ", ".join(FAKE_SKILLS[(i + k) % len(FAKE_SKILLS)] for k in range(3))
+            if distinct:
+                stack += f", project {i}"
+            f.write(f'"{stack}","https://example.com/portfolio/{i}"\n')
+
+
+def benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="smartreach-bench-")
+    # Uncached, so every repeat measures a real cold ingest
+    embedding_function = create_embedding_function() if args.real_embeddings else HashEmbeddingFunction()
+    chain = Chain(use_cache=False, llm=FakeLLM(latency=args.llm_latency))
+    results = {}
+
+    try:
+        csv_path = os.path.join(workdir, "portfolio.csv")
+        write_portfolio_csv(csv_path, args.portfolio_rows)
+
+        def fresh_portfolio():
+            directory = tempfile.mkdtemp(dir=workdir)
+            return Portfolio(csv_path, persist_directory=directory, embedding_function=embedding_function)
+
+        stats = run_stage(lambda p: p.load_portfolio(), fresh_portfolio, args.repeat)
+        stats["throughput"] = args.portfolio_rows / (stats["p50_ms"] / 1000)
+        stats["throughput_unit"] = "rows/s"
+        results[f"load_portfolio/{args.portfolio_rows}rows"] = stats
+
+        portfolio = fresh_portfolio()
+        portfolio.load_portfolio()
+
+        for size in args.sizes:
+            page = synthetic_page(size)
+            cleaned = clean_text(page)
+            chunks, _ = chain._chunk_text(cleaned)
+            raw_jobs = [job for chunk in chunks for job in chain._process_job_chunk(chunk)]
+            jobs = chain._deduplicate_jobs(raw_jobs)
+            skills = [job.get("skills", []) for job in jobs]
+
+            stages = {
+                "clean_text": (lambda _: clean_text(page), size / 1e6, "MB/s"),
+                "chunk_text": (lambda _: chain._chunk_text(cleaned), len(cleaned) / 1e6, "MB/s"),
+                "process_job_chunk": (lambda _: [chain._process_job_chunk(c) for c in chunks], len(chunks), "chunks/s"),
+                "deduplicate_jobs": (lambda _: chain._deduplicate_jobs(raw_jobs), len(raw_jobs), "jobs/s"),
+                # Clear the skill cache each run so every query goes to Chroma
+                "query_links": (lambda _: [portfolio._link_cache.clear(), [portfolio.query_links(s) for s in skills]],
+                                len(skills), "jobs/s"),
+                "write_mail": (lambda _: [chain.write_mail(job, []) for job in jobs], len(jobs), "emails/s"),
+            }
+            for name, (func, work, unit) in stages.items():
+                stats = run_stage(func, lambda: None, args.repeat)
+                stats["throughput"] = work / (stats["p50_ms"] / 1000) if stats["p50_ms"] else 0.0
+                stats["throughput_unit"] = unit
+                results[f"{name}/{size}"] = stats
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print p50 changes against the baseline and return the stages slower than threshold."""
+    regressions = []
+    print(f"\n{'stage':<36} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["p50_ms"], stats["p50_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = " !" if change > threshold else ""
+        print(f"{name:<36} {before:>10.2f} {after:>10.2f} {change:>+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Synthetic page sizes in characters")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--portfolio-rows", type=int, default=500)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Use the configured local embedding model (SMARTREACH_EMBEDDING_MODEL)")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a JSON baseline saved with --save")
+    parser.add_argument("--fail-threshold", type=float, default=None,
+                        help="Exit non-zero if any stage's p50 is slower than the baseline by this fraction")
+    args = parser.parse_args()
+
+    results = benchmark(args)
+
+    print(f"{'stage':<36} {'p50 ms':>10} {'p95 ms':>10} {'throughput':>18} {'peak KB':>10}")
+    for name, stats in results.items():
+        throughput = f"{stats['throughput']:.1f} {stats['throughput_unit']}"
+        print(f"{name:<36} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} {throughput:>18} {stats['peak_kb']:>10.0f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "args": vars(args), "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.fail_threshold if args.fail_threshold is not None else 0.1)
+        if regressions and args.fail_threshold is not None:
+            sys.exit(f"{len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
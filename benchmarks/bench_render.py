@@ -0,0 +1,123 @@
+"""
+Static fetch versus headless-browser rendering on local careers-page fixtures.
+
+Two fixtures are written to a temporary directory and served by a local HTTP server: a
+server-rendered page with the postings in the HTML, and a single-page-app shell whose
+postings are inserted by JavaScript after load. For each, the static fetch, a cold render,
+a render on a warm (pooled) browser and a render served from the page cache are timed, with
+the length of the text each one finds. Render rows are skipped when no browser is available.
+
+    python benchmarks/bench_render.py [--jobs 30] [--repeat 3]
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import fetcher  # noqa: E402
+from fetcher import fetch_html, html_to_text, looks_incomplete  # noqa: E402
+from renderer import RenderUnavailable, get_browser_pool, render_html  # noqa: E402
+
+ROLES = ["Python Developer", "Frontend Engineer", "Data Scientist", "DevOps Engineer", "QA Analyst"]
+
+
+def postings(count):
+    return [{
+        "role": ROLES[i % len(ROLES)],
+        "description": f"Posting {i}: build and run services for our customers, {i % 7 + 1}+ years of experience, "
+                       f"strong communication skills and ownership of production systems."
+    } for i in range(count)]
+
+
+def static_page(jobs):
+    items = "".join(f"<li><h2>{job['role']}</h2><p>{job['description']}</p></li>" for job in jobs)
+    return f"<html><head><title>Careers</title></head><body><nav>Home About</nav><ul>{items}</ul></body></html>"
+
+
+def spa_page(jobs):
+    return f"""<html><head><title>Careers</title></head><body>
+<noscript>You need to enable JavaScript to run this app.</noscript>
+<div id="root"></div>
+<script>
+setTimeout(function () {{
+  var jobs = {json.dumps(jobs)};
+  var root = document.getElementById("root");
+  jobs.forEach(function (job) {{
+    var item = document.createElement("div");
+    item.innerHTML = "<h2>" + job.role + "</h2><p>" + job.description + "</p><img src='logo.png'>";
+    root.appendChild(item);
+  }});
+}}, 300);
+</script></body></html>"""
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    """Serve directory over HTTP on a free local port; returns the server and its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+
+def timed(func, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - started)
+    return min(durations) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=30, help="Postings per fixture page")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_render_")
+    fetcher._page_cache = fetcher.PageCache(os.path.join(workdir, "page_cache"))
+    jobs = postings(args.jobs)
+    fixtures = {"static": static_page(jobs), "spa": spa_page(jobs)}
+    server, base_url = serve(workdir)
+
+    print(f"{'fixture':>8} {'mode':>14} {'ms':>9} {'text chars':>11} {'incomplete':>11}")
+    for name, page in fixtures.items():
+        path = os.path.join(workdir, f"{name}.html")
+        with open(path, "w") as f:
+            f.write(page)
+        url = base_url + f"{name}.html"
+
+        # Bypass the page cache so every static run goes over HTTP
+        ms, html = timed(lambda: fetch_html(url, use_cache=False), args.repeat)
+        text = html_to_text(html)
+        print(f"{name:>8} {'static':>14} {ms:>9.1f} {len(text):>11} {str(looks_incomplete(html, text)):>11}")
+
+        try:
+            cases = [
+                ("render cold", lambda: render_html(url, use_cache=False), 1),
+                ("render warm", lambda: render_html(url, use_cache=False), args.repeat),
+                ("render cached", lambda: render_html(url), args.repeat),
+            ]
+            for mode, func, repeat in cases:
+                ms, html = timed(func, repeat)
+                print(f"{name:>8} {mode:>14} {ms:>9.1f} {len(html_to_text(html)):>11} {'':>11}")
+        except RenderUnavailable as e:
+            print(f"{name:>8} {'render':>14} skipped: {e}")
+    get_browser_pool().close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from json_recovery import recover_json_objects
+
+
+def test_array_with_preamble_and_fence():
+    text = 'Here are the jobs:\n```json\n[{"role": "a"}, {"role": "b"}]\n```\nLet me know!'
+    objects, stats = recover_json_objects(text)
+    assert objects == [{"role": "a"}, {"role": "b"}]
+    assert stats == {"recovered": 2, "lost": 0, "truncated": False}
+
+
+def test_truncated_array_keeps_complete_elements():
+    objects, stats = recover_json_objects('[{"role": "a"}, {"role": "b", "description": "cut of')
+    assert objects == [{"role": "a"}]
+    assert stats == {"recovered": 1, "lost": 1, "truncated": True}
+
+
+def test_unparseable_element_is_lost():
+    objects, stats = recover_json_objects('[{"role": "a"}, {"role": b}, {"role": "c",}]')
+    assert objects == [{"role": "a"}, {"role": "c"}]
+    assert stats["lost"] == 1
+
+
+def test_nested_array_belongs_to_its_object():
+    objects, stats = recover_json_objects('Sure! {"role": "Dev", "details": [{"k": 1}, {"k": 2}]}')
+    assert objects == [{"role": "Dev", "details": [{"k": 1}, {"k": 2}]}]
+    assert stats["lost"] == 0
+
+
+def test_nested_arrays_in_elements_are_not_collected():
+    objects, _ = recover_json_objects('[{"role": "Dev", "details": [{"k": 1}]}] done')
+    assert objects == [{"role": "Dev", "details": [{"k": 1}]}]
+
+
+def test_wrapper_object():
+    objects, stats = recover_json_objects('{"jobs": [{"role": "a"}, {"role": "b"}]}')
+    assert objects == [{"role": "a"}, {"role": "b"}]
+    assert stats["lost"] == 0
+
+
+def test_truncated_wrapper_object():
+    objects, stats = recover_json_objects('{"jobs": [{"role": "a"}, {"role": "b", "desc')
+    assert objects == [{"role": "a"}]
+    assert stats == {"recovered": 1, "lost": 1, "truncated": True}
+
+
+def test_quoted_bracket_in_preamble():
+    objects, stats = recover_json_objects('he said "[" then [{"role":"a"}]')
+    assert objects == [{"role": "a"}]
+    assert stats == {"recovered": 1, "lost": 0, "truncated": False}
+
+
+def test_unbalanced_quote_in_preamble_ends_with_its_line():
+    objects, stats = recover_json_objects('Here is the "list:\n[{"role": "a"}]')
+    assert objects == [{"role": "a"}]
+    assert stats["lost"] == 0
+
+
+def test_unterminated_scan_counts_as_lost():
+    objects, stats = recover_json_objects('he said [ then [{"role":"a"}]')
+    assert objects == []
+    assert stats == {"recovered": 0, "lost": 1, "truncated": True}
+
+
+def test_top_level_objects_without_array():
+    objects, stats = recover_json_objects('{"role": "a"}\n{"role": "b"}\n{"role": "c", "desc')
+    assert objects == [{"role": "a"}, {"role": "b"}]
+    assert stats == {"recovered": 2, "lost": 1, "truncated": True}
+
+
+def test_prose_only():
+    assert recover_json_objects("I could not find any jobs on this page.") == (
+        [], {"recovered": 0, "lost": 0, "truncated": False})
+
+
+def test_object_with_leading_array_is_a_record():
+    objects, stats = recover_json_objects('Here is the job: {"skills": ["Python"], "role": "Dev"}')
+    assert objects == [{"skills": ["Python"], "role": "Dev"}]
+    assert stats == {"recovered": 1, "lost": 0, "truncated": False}
+
+
+def test_object_with_leading_array_of_objects_is_a_record():
+    objects, stats = recover_json_objects('{"skills": [{"name": "Python"}], "role": "Dev"}')
+    assert objects == [{"skills": [{"name": "Python"}], "role": "Dev"}]
+    assert stats == {"recovered": 1, "lost": 0, "truncated": False}
+
+
+def test_empty_wrapper_is_returned_as_object():
+    objects, stats = recover_json_objects('Result: {"jobs": []}')
+    assert objects == [{"jobs": []}]
+    assert stats["lost"] == 0